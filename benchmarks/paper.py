@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Order handling throughput of a strategy loop running against
+PaperExchange: place, query and cancel through Bittrex methods.
+
+    python benchmarks/paper.py [orders]
+"""
+
+import sys
+from time import perf_counter
+
+from bittrex_v2 import Bittrex
+from bittrex_v2.paper import PaperExchange
+
+
+BOOK = {'buy': [{'Rate': 0.05 - i * 1e-5, 'Quantity': 10} for i in range(100)],
+        'sell': [{'Rate': 0.051 + i * 1e-5, 'Quantity': 10} for i in range(100)]}
+
+
+def main(number=10000):
+    paper = PaperExchange(balances={'BTC': 10 ** 6, 'ETH': 10 ** 6})
+    paper.load_orderbook('BTC-ETH', BOOK)
+    bittrex = Bittrex('paper', 'paper', transport=paper)
+
+    start = perf_counter()
+    for i in range(number):
+        order = bittrex.place_order('buy', 'BTC-ETH', 1, '0.0505',
+                                    'LIMIT', 'GOOD_TIL_CANCELLED')
+        uuid = order['result']['OrderId']
+        bittrex.get_order(uuid)
+        bittrex.cancel(uuid)
+    elapsed = perf_counter() - start
+
+    print('%d place/get/cancel cycles in %.2f s: %.0f orders/s'
+          % (number, elapsed, number / elapsed))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
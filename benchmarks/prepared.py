@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Per call overhead of Bittrex.__call__ against PreparedCommand
+for a private 'getorder' request. A no-op transport is used, so
+only url building, signing and json decoding are measured.
+
+    python benchmarks/prepared.py [iterations]
+"""
+
+import sys
+from timeit import timeit
+
+from bittrex_v2 import Bittrex
+from bittrex_v2.transport import Response
+
+
+BODY = b'{"success":true,"message":"","result":null}'
+UUID = '0cb4c4e4-bdc7-4e13-8c13-430e587d2cc1'
+
+
+def noop_transport(url, headers, timeout):
+    return Response(200, BODY)
+
+
+def main(number=100000):
+    bittrex = Bittrex('key', 'secret', transport=noop_transport)
+    get_order = bittrex.prepare('orders', 'getorder')
+
+    call = timeit(lambda: bittrex.get_order(UUID), number=number)
+    prepared = timeit(lambda: get_order({'orderid': UUID}), number=number)
+
+    print('__call__         : %7.2f us/call' % (call / number * 1e6))
+    print('PreparedCommand  : %7.2f us/call' % (prepared / number * 1e6))
+    print('speedup          : %7.2fx' % (call / prepared))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cold start of bittrex_v2 for short-lived processes: import time
+and latency of the first request against a local HTTP stub,
+each measured in a fresh interpreter.
+
+    python benchmarks/startup.py [runs]
+"""
+
+import os
+import sys
+import json
+import subprocess
+from statistics import median
+from threading import Thread
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+BODY = b'{"success":true,"message":"","result":[]}'
+
+CHILD = r'''
+import sys, json
+from time import perf_counter
+t0 = perf_counter()
+import bittrex_v2
+t1 = perf_counter()
+heavy = 'requests' in sys.modules
+
+from bittrex_v2.transport import RequestsTransport
+stub, local = RequestsTransport(), sys.argv[1]
+def transport(url, headers, timeout):
+    return stub(url.replace('https://bittrex.com', local), headers, timeout)
+
+t2 = perf_counter()
+bittrex_v2.Bittrex(transport=transport).get_market_summaries()
+t3 = perf_counter()
+print(json.dumps({'import': t1 - t0, 'first_call': t3 - t2,
+                  'requests_on_import': heavy}))
+'''
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def main(runs=10):
+    server = HTTPServer(('127.0.0.1', 0), StubHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    local = 'http://127.0.0.1:%d' % server.server_port
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, '-c', CHILD, local],
+                                      env=env)
+        samples.append(json.loads(out))
+    server.shutdown()
+
+    print('import bittrex_v2 : %7.2f ms' %
+          (median(s['import'] for s in samples) * 1e3))
+    print('first call        : %7.2f ms' %
+          (median(s['first_call'] for s in samples) * 1e3))
+    print('requests imported by "import bittrex_v2": %s' %
+          any(s['requests_on_import'] for s in samples))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
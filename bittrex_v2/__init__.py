@@ -7,6 +7,45 @@ __author__ = 'Álvaro Mondéjar Rubio <mondejar1994@gmail.com>'
 __repo__    = 'https://github.com/mondeja/bittrex_v2'
 __license__ = 'BSD License'
 
-from .bittrex import (Bittrex, BittrexError,
+from .bittrex import (Bittrex, BittrexError, PreparedCommand,
                       PUBLIC_COMMANDS,
-                      PRIVATE_COMMANDS)
\ No newline at end of file
+                      PRIVATE_COMMANDS)
+
+# Optional components are imported on first access (PEP 562, hence
+# python_requires >= 3.8), so that 'import bittrex_v2' stays cheap for
+# short-lived processes.
+_LAZY = {
+    'TickArchive': 'ticks',
+    'TickSeries': 'ticks',
+    'RequestsTransport': 'transport',
+    'RecordingTransport': 'transport',
+    'ReplayTransport': 'transport',
+    'RateLimiter': 'ratelimit',
+    'BittrexPool': 'pool',
+    'OrderBook': 'orderbook',
+    'book_metrics': 'orderbook',
+    'MarketDataPublisher': 'bus',
+    'MarketDataReader': 'bus',
+    'ArbitrageGraph': 'arbitrage',
+    'MetadataIndex': 'metadata',
+    'PaperExchange': 'paper',
+    'PrefetchScheduler': 'prefetch',
+    'Deadline': 'deadline',
+    'DeadlineExceeded': 'deadline',
+    }
+
+__all__ = ['Bittrex', 'BittrexError', 'PreparedCommand',
+           'PUBLIC_COMMANDS', 'PRIVATE_COMMANDS'] + list(_LAZY)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        from importlib import import_module
+        value = getattr(import_module('.' + _LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
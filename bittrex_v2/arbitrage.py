@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Triangular arbitrage detection over market summaries.
+
+Every market BASE-QUOTE gives two edges in the currency graph:
+BASE -> QUOTE (buy QUOTE at Ask, rate 1 / Ask) and QUOTE -> BASE
+(sell QUOTE at Bid, rate Bid). Candidate cycles are computed once
+from market names, then each update only re-evaluates the cycles
+touching edges whose rates changed.
+"""
+
+from collections import namedtuple
+
+
+Opportunity = namedtuple('Opportunity', ['path', 'markets', 'profit'])
+
+
+def _summary(entry):
+    # get_market_summaries() entries wrap the summary, get_market_summary()
+    # results are the summary itself.
+    return entry.get('Summary', entry)
+
+
+class ArbitrageGraph(object):
+    """
+    Currency graph with precomputed triangular cycles.
+
+    >>> graph = ArbitrageGraph(b.get_market_summaries()['result'])
+    >>> graph.update(b.get_market_summaries()['result'])
+    [Opportunity(path=('BTC', 'ETH', 'LTC', 'BTC'), ...)]
+
+    :param markets: Market names (ex: 'BTC-ETH') or summaries
+    :type markets: iterable
+
+    :param fee: Fee charged on every trade (default == 0.0025)
+    :type fee: float
+
+    :param min_profit: Minimum relative profit reported by
+        update() and opportunities() (default == 0.0)
+    :type min_profit: float
+    """
+    def __init__(self, markets, fee=0.0025, min_profit=0.0):
+        self.fee = fee
+        self.min_profit = min_profit
+        self._edges = {}
+        self._edge_market = []
+        self._rates = []
+        self._market_edges = {}
+        neighbors = {}
+
+        summaries = []
+        for market in markets:
+            if not isinstance(market, str):
+                summaries.append(market)
+                market = _summary(market)['MarketName']
+            if market in self._market_edges:
+                continue
+            base, quote = market.split('-', 1)
+            buy = self._add_edge(base, quote, market)
+            sell = self._add_edge(quote, base, market)
+            self._market_edges[market] = (buy, sell)
+            neighbors.setdefault(base, set()).add(quote)
+            neighbors.setdefault(quote, set()).add(base)
+
+        self.cycles = []
+        self._edge_cycles = [[] for _ in self._rates]
+        for a in sorted(neighbors):
+            for b in sorted(n for n in neighbors[a] if n > a):
+                for c in sorted(n for n in neighbors[a] & neighbors[b]
+                                if n > b):
+                    self._add_cycle((a, b, c))
+                    self._add_cycle((a, c, b))
+
+        if summaries:
+            self.update(summaries)
+
+    def _add_edge(self, src, dst, market):
+        index = len(self._rates)
+        self._edges[(src, dst)] = index
+        self._edge_market.append(market)
+        self._rates.append(0.0)
+        return index
+
+    def _add_cycle(self, path):
+        edges = (self._edges[(path[0], path[1])],
+                 self._edges[(path[1], path[2])],
+                 self._edges[(path[2], path[0])])
+        index = len(self.cycles)
+        self.cycles.append((path + (path[0],), edges))
+        for edge in edges:
+            self._edge_cycles[edge].append(index)
+
+    def rate(self, src, dst):
+        """Current conversion rate from <src> to <dst> currency."""
+        return self._rates[self._edges[(src, dst)]]
+
+    def update(self, summaries):
+        """
+        Updates edge rates from summaries and re-evaluates the
+        cycles touching changed edges. Unknown markets are ignored.
+
+        :param summaries: get_market_summaries() 'result' list,
+            or a subset of it
+        :type summaries: iterable
+
+        :return: Profitable cycles among the re-evaluated ones
+        :rtype : list of Opportunity
+        """
+        rates = self._rates
+        changed = set()
+        for entry in summaries:
+            summary = _summary(entry)
+            edges = self._market_edges.get(summary['MarketName'])
+            if edges is None:
+                continue
+            ask, bid = summary.get('Ask'), summary.get('Bid')
+            buy_rate = 1.0 / float(ask) if ask else 0.0
+            sell_rate = float(bid) if bid else 0.0
+            buy, sell = edges
+            if rates[buy] != buy_rate:
+                rates[buy] = buy_rate
+                changed.add(buy)
+            if rates[sell] != sell_rate:
+                rates[sell] = sell_rate
+                changed.add(sell)
+
+        touched = set()
+        for edge in changed:
+            touched.update(self._edge_cycles[edge])
+        return self.evaluate(touched)
+
+    def evaluate(self, cycles=None):
+        """
+        Evaluates cycles (all of them by default) and returns the
+        profitable ones sorted by profit, best first.
+
+        :param cycles: Cycle indexes into self.cycles
+        :type cycles: iterable
+
+        :rtype : list of Opportunity
+        """
+        rates, markets = self._rates, self._edge_market
+        keep = (1.0 - self.fee) ** 3
+        threshold = 1.0 + self.min_profit
+        found = []
+        for index in (range(len(self.cycles)) if cycles is None else cycles):
+            path, (e1, e2, e3) = self.cycles[index]
+            gain = rates[e1] * rates[e2] * rates[e3] * keep
+            if gain > threshold:
+                found.append(Opportunity(path,
+                                         (markets[e1], markets[e2],
+                                          markets[e3]),
+                                         gain - 1.0))
+        found.sort(key=lambda o: o.profit, reverse=True)
+        return found
+
+    def opportunities(self):
+        """Profitable cycles over the whole graph."""
+        return self.evaluate()
@@ -5,12 +5,9 @@
 from urllib.parse import urlencode as _urlencode
 from decimal import Decimal
 from json import loads as _loads
-from hmac import new as _new
-from hashlib import sha512 as _sha512
 from time import time, sleep
-# 3rd party
-from requests.exceptions import HTTPError
-from requests import get as _get
+from threading import Lock
+from functools import partial
 
 
 PUBLIC_COMMANDS = [
@@ -41,6 +38,33 @@ PRIVATE_COMMANDS = [
     ]
 
 
+# Default timeouts (sec) by command, used unless Bittrex is given a
+# timeout, other commands use DEFAULT_TIMEOUT
+DEFAULT_TIMEOUT = 5
+COMMAND_TIMEOUTS = {
+    'GetTicks': 30,
+    'getmarketsummaries': 10,
+    'getorderhistory': 15,
+    'getwithdrawalhistory': 15,
+    'getdeposithistory': 15,
+    'tradecancel': 2,
+    'tradebuy': 3,
+    'tradesell': 3,
+    }
+
+# Commands never retried, a lost response doesn't mean nothing happened
+UNSAFE_COMMANDS = ('tradebuy', 'tradesell', 'withdraw', 'withdrawcurrency')
+
+BASE_URL = 'https://bittrex.com/Api/v2.0/'
+
+
+def _close(body):
+    """Closes a streamed body, plain bodies have nothing to close."""
+    close = getattr(body, 'close', None)
+    if close is not None:
+        close()
+
+
 class BittrexError(Exception):
     """
     Exception for catch invalid commands and other repsonses
@@ -62,10 +86,29 @@ class Bittrex(object):
     :type api_secret: str
 
     :param timeout: time in sec to wait for an api response
-        (otherwise 'requests.exceptions.TimeoutError' is raised)
-        (default == 5)
+        (otherwise 'requests.exceptions.TimeoutError' is raised),
+        with None COMMAND_TIMEOUTS apply and other commands wait
+        DEFAULT_TIMEOUT (default == None)
     :type timeout: int
 
+    :param command_timeouts: Timeouts by command, overriding
+        timeout for those commands (default == None)
+    :type command_timeouts: dict
+
+    :param connect_timeout: Maximum part of the time left for an
+        active 'bittrex_v2.deadline.Deadline' given to connect,
+        the rest is left for reading (default == 3.05)
+    :type connect_timeout: float
+
+    :param retries: Times a failed request (connection error or 5xx
+        status) is retried while the deadline allows it, orders and
+        withdrawals are never retried (default == 0)
+    :type retries: int
+
+    :param max_body_size: Maximum decoded response size in bytes,
+        larger responses raise 'BittrexError' (default == None)
+    :type max_body_size: int
+
     :param parse_float: parser used by json.loads() for
             retrieve float type returns (default == Decimal)
     :type parse_float: any
@@ -78,30 +121,66 @@ class Bittrex(object):
         used in calls (default == False)
     :type debug_endpoint: bool
 
+    :param transport: Callable used to send requests, see
+        'bittrex_v2.transport' (default == RequestsTransport())
+    :type transport: callable
+
+    :param rate_limit: Requests per second allowed or a shared
+        'bittrex_v2.ratelimit.RateLimiter' (default == None, no limit)
+    :type rate_limit: float or RateLimiter
+
+    :param metadata: Index used to validate market and currency
+        arguments locally, see 'bittrex_v2.metadata' (default == None)
+    :type metadata: MetadataIndex
+
     """
     def __init__(self, api_key=None, api_secret=None,
-                timeout=5, parse_float=Decimal, parse_int=int,
-                debug_endpoint=False):
+                timeout=None, parse_float=Decimal, parse_int=int,
+                debug_endpoint=False, transport=None, rate_limit=None,
+                metadata=None, command_timeouts=None, connect_timeout=3.05,
+                retries=0, max_body_size=None):
 
         self.api_key = str(api_key) if api_key else None
         self.api_secret = str(api_secret) if api_secret else None
-        self.timeout = timeout
+        # An explicit timeout applies to every command, as it always did
+        defaults = COMMAND_TIMEOUTS if timeout is None else {}
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self.command_timeouts = dict(defaults, **(command_timeouts or {}))
+        self.connect_timeout = connect_timeout
+        self.retries = retries
         self.parse_float = parse_float
         self.parse_int = parse_int
         self.debug_endpoint = debug_endpoint
+        self.max_body_size = max_body_size
+        if transport is None:
+            from .transport import RequestsTransport
+            transport = RequestsTransport(max_body_size=max_body_size)
+        self.transport = transport
+        if rate_limit is not None and not hasattr(rate_limit, 'acquire'):
+            from .ratelimit import RateLimiter
+            rate_limit = RateLimiter(rate_limit)
+        self.rate_limit = rate_limit
+        self.metadata = metadata
+        # Set by 'bittrex_v2.prefetch.PrefetchScheduler'
+        self.prefetch = None
+        self._nonce = 0
+        self._nonce_lock = Lock()
 
     @property
     def nonce(self):
-        self._nonce = int(time()*1000)
-        return self._nonce
+        # Strictly increasing, even for concurrent calls in the same ms
+        with self._nonce_lock:
+            self._nonce = max(int(time()*1000), self._nonce + 1)
+            return self._nonce
 
-    def __call__(self, group, command, args={}):
+    def __call__(self, group, command, args=None, parse_float=None):
         """
         Queries Bittrex with given method and args
         - encodes and sends <command> with optional [args] to Poloniex api
         - raises 'bittrex.BittrexError' if an api key or secret is missing
             (and the command is 'private') or if the <command> is not valid
-        - returns decoded json api message
+        - returns decoded json api message, served from the attached
+            'bittrex_v2.prefetch.PrefetchScheduler' when it is fresh
 
         :param group: Param for queries classification in API
         :type command: str
@@ -109,62 +188,213 @@ class Bittrex(object):
         :param command: Query method for getting info
         :type command: str
 
-        :param args: Extra options for query
+        :param args: Extra options for query (not modified)
         :type args: dict
 
+        :param parse_float: Overrides client parse_float for this call
+        :type parse_float: any
+
         :return: JSON response from Bittrex
         :rtype : dict
         """
-
-        from requests.exceptions import ReadTimeout, ConnectionError
-        base_url = 'https://bittrex.com/Api/v2.0/'
+        if self.prefetch is not None:
+            return self.prefetch.get(group, command, args, parse_float)
+        return self._fetch(group, command, args, parse_float)
+
+    def _fetch(self, group, command, args=None, parse_float=None):
+        """Sends a command, bypassing the prefetch cache."""
+        return self._request(partial(self._url, group, command, args),
+                             parse_float, command)
+
+    def stream(self, group, command, args=None, parse_float=None):
+        """
+        Queries Bittrex like __call__() but reads the response body
+        incrementally, returning an iterator over the items of
+        'result' that yields records while the body is downloaded.
+        If 'result' is not a list it is yielded once, null yields
+        nothing. Failed requests are retried like in __call__().
+
+        >>> for tick in b.stream('market', 'GetTicks',
+        ...                      {'marketName': 'BTC-ETH',
+        ...                       'tickInterval': 'oneMin'}):
+
+        :return: Iterator over result records
+        :rtype : iterator
+        """
+        from .deadline import current
+        from .streaming import iter_result
+        chunks = self._open(partial(self._url, group, command, args),
+                            command, stream=True)
+        return iter_result(self._limit(chunks, current()),
+                           parse_float or self.parse_float, self.parse_int)
+
+    def _limit(self, chunks, deadline=None):
+        """Passes chunks through, enforcing max_body_size and deadline."""
+        size = 0
+        try:
+            for chunk in chunks:
+                if deadline is not None:
+                    deadline.check()
+                size += len(chunk)
+                if self.max_body_size and size > self.max_body_size:
+                    raise BittrexError("Response body exceeds %s bytes"
+                                       % self.max_body_size)
+                yield chunk
+        finally:
+            _close(chunks)
+
+    def _url(self, group, command, args=None):
+        """
+        Returns url and headers of a request, signed
+        for private commands.
+        """
+        args = args or {}
 
         if command in PRIVATE_COMMANDS:
             if not self.api_key or not self.api_secret:
                 raise BittrexError("Key and Secret needed!")
-            url = base_url + 'key/{}/{}?'.format(group, command)
+            url = BASE_URL + 'key/{}/{}?'.format(group, command)
 
-            args['nonce'] = self.nonce
-            args['apikey'] = self.api_key
-            url += _urlencode(args)
+            params = dict(args)
+            params['nonce'] = self.nonce
+            params['apikey'] = self.api_key
+            url += _urlencode(params)
 
             if self.debug_endpoint == True:
                 print(url)
 
+            from hmac import new as _new
+            from hashlib import sha512 as _sha512
             sign = _new(self.api_secret.encode('utf-8'),
                         url.encode('utf-8'),_sha512).hexdigest()
-            # post request
-            ret = _get(url, headers={'apisign': sign},
-                        timeout=self.timeout)
-
-            if ret.status_code != 200:
-                raise BittrexError("Status Code: %s" % ret.status_code)
-
-            jsonout = _loads(ret.text,
-                             parse_float=self.parse_float,
-                             parse_int=self.parse_int)
-            return jsonout
+            return url, {'apisign': sign}
 
         elif command in PUBLIC_COMMANDS:
-            base_url += 'pub/{}/'.format(group)
-
-            url = base_url + command + '?' + _urlencode(args)
+            url = BASE_URL + 'pub/{}/'.format(group)
+            url += command + '?' + _urlencode(args)
 
             if self.debug_endpoint == True:
                 print(url)
 
-            ret = _get(url, timeout=self.timeout)
-
-            if ret.status_code != 200:
-                raise BittrexError("Status Code: %s" % ret.status_code)
-
-            jsonout = _loads(ret.text,
-                             parse_float=self.parse_float,
-                             parse_int=self.parse_int)
-            return jsonout
+            return url, {}
         else:
             raise BittrexError("Invalid Command: %s" % command)
 
+    def prepare(self, group, command, args=None):
+        """
+        Returns a PreparedCommand for repeated calls of the same
+        command: url prefix, static args and signing key are
+        computed once, only nonce and signature are built per call.
+
+        >>> get_order = b.prepare('orders', 'getorder')
+        >>> get_order({'orderid': uuid})
+
+        :param group: Param for queries classification in API
+        :type command: str
+
+        :param command: Query method for getting info
+        :type command: str
+
+        :param args: Static options for every call (not modified)
+        :type args: dict
+
+        :rtype : PreparedCommand
+        """
+        return PreparedCommand(self, group, command, args)
+
+    def _timeout(self, command, deadline):
+        """
+        Returns the timeout for a command, split in (connect, read)
+        and capped to the time left when a deadline is active.
+        """
+        timeout = self.command_timeouts.get(command, self.timeout)
+        if deadline is None:
+            return timeout
+        deadline.check()
+        budget = min(timeout, deadline.remaining())
+        connect = min(self.connect_timeout, budget / 2)
+        return (connect, budget - connect)
+
+    def _acquire(self, deadline):
+        """Waits for the rate limit, within the deadline if any."""
+        if self.rate_limit is not None:
+            wait = None if deadline is None else deadline.remaining()
+            if not self.rate_limit.acquire(wait):
+                from .deadline import DeadlineExceeded
+                raise DeadlineExceeded("Rate limit wait exceeds deadline")
+
+    def _open(self, sign, command=None, stream=False):
+        """
+        Sends a GET request through the client transport, retrying
+        connection errors and 5xx responses while the deadline allows
+        it, and returns the body of a 200 response. With stream, the
+        body is returned as an iterator of chunks; errors once chunks
+        are being read are not retried.
+
+        :param sign: Returns (url, headers), called for every attempt
+            so that retries of private commands get a new nonce
+        :type sign: callable
+        """
+        from .deadline import current, DeadlineExceeded
+        deadline = current()
+        retries = 0 if command in UNSAFE_COMMANDS else self.retries
+        send = getattr(self.transport, 'stream', None) if stream else None
+
+        for attempt in range(retries + 1):
+            self._acquire(deadline)
+            timeout = self._timeout(command, deadline)
+            url, headers = sign()
+            try:
+                if send is not None:
+                    status, body = send(url, headers, timeout)
+                else:
+                    ret = self.transport(url, headers, timeout)
+                    status, body = ret.status_code, ret.content
+                    if stream:
+                        body = (body,)
+            except OSError:
+                # requests exceptions are IOError subclasses
+                if attempt == retries:
+                    raise
+            else:
+                if status < 500 or attempt == retries:
+                    break
+                _close(body)
+            backoff = 0.1 * 2 ** attempt
+            if deadline is not None and deadline.remaining() <= backoff:
+                raise DeadlineExceeded("No time left to retry %s" % command)
+            sleep(backoff)
+
+        if status != 200:
+            _close(body)
+            raise BittrexError("Status Code: %s" % status)
+        return body
+
+    def _request(self, sign, parse_float=None, command=None):
+        """
+        Sends a GET request through the client transport
+        and returns the decoded json api message.
+
+        :param sign: Returns (url, headers) of every attempt
+        :type sign: callable
+        """
+        content = self._open(sign, command)
+        if self.max_body_size and len(content) > self.max_body_size:
+            raise BittrexError("Response body exceeds %s bytes"
+                               % self.max_body_size)
+
+        return _loads(content,
+                      parse_float=parse_float or self.parse_float,
+                      parse_int=self.parse_int)
+
+    def _check_market(self, market, online=False):
+        if self.metadata is not None:
+            self.metadata.check_market(market, online)
+
+    def _check_currency(self, currency, online=False):
+        if self.metadata is not None:
+            self.metadata.check_currency(currency, online)
+
     """ ###########################################
         ############  PUBLIC COMMANDS  ############
         ###########################################
@@ -181,6 +411,7 @@ class Bittrex(object):
         :return: Available market summary in JSON
         :rtype : dict
         """
+        self._check_market(market)
         return self.__call__('market', 'getmarketsummary',
                             {'marketname': market})
 
@@ -196,6 +427,18 @@ class Bittrex(object):
         """
         return self.__call__('markets', 'getmarketsummaries')
 
+    def get_markets(self):
+        """
+        Used to get the open and available trading markets
+        at Bittrex along with other meta data.
+
+        pub/markets/getmarkets
+
+        :return: Available markets info in JSON
+        :rtype : dict
+        """
+        return self.__call__('markets', 'getmarkets')
+
     def get_currencies(self):
         """
         Used to get all availables currencies
@@ -222,7 +465,7 @@ class Bittrex(object):
         return self.__call__('currencies', 'getwallethealth')
 
 
-    def get_market_orderbook(self, market):
+    def get_market_orderbook(self, market, compact=False):
         """
         Used to get information about a given market orderbook
 
@@ -231,11 +474,25 @@ class Bittrex(object):
         :param market: String literal for the market (ex: BTC-LTC)
         :type market: str
 
+        :param compact: With True, 'result' is decoded straight into a
+            'bittrex_v2.orderbook.OrderBook' of float arrays
+            (default == False)
+        :type compact: bool
+
         :return: Market orderbook info in JSON
         :rtype : dict
         """
-        return self.__call__('market', 'getmarketorderbook',
-                            {'marketname': market})
+        self._check_market(market)
+        if not compact:
+            return self.__call__('market', 'getmarketorderbook',
+                                {'marketname': market})
+
+        from .orderbook import OrderBook
+        ret = self.__call__('market', 'getmarketorderbook',
+                            {'marketname': market}, parse_float=float)
+        if ret.get('success') and ret.get('result') is not None:
+            ret['result'] = OrderBook.from_result(market, ret['result'])
+        return ret
 
     def get_ticks(self, market, period):
         """
@@ -254,6 +511,7 @@ class Bittrex(object):
         :return: Market historical chart data info in JSON
         :rtype : dict
         """
+        self._check_market(market)
         return self.__call__('market', 'GetTicks',
                             {'marketName': market,
                              'tickInterval': period})
@@ -288,6 +546,7 @@ class Bittrex(object):
         :rtype : dict
         """
         if market:
+            self._check_market(market)
             return self.__call__('market', 'getopenorders',
                                  {'marketname': market})
         return self.__call__('orders', 'getopenorders')
@@ -314,6 +573,7 @@ class Bittrex(object):
         :rtype : dict
         """
         if currency:
+            self._check_currency(currency)
             return self.__call__('balance', 'getbalance',
                                  {'currencyname': currency})
         return self.__call__('balance', 'getbalances')
@@ -353,6 +613,7 @@ class Bittrex(object):
         :param address: Address to send your withdrawal
         :type amount: str
         """
+        self._check_currency(currency, online=True)
         return self.__call__('balance', 'withdrawcurrency',
                              {"currencyname": currency,
                               "quantity": amount,
@@ -365,6 +626,7 @@ class Bittrex(object):
         Places a buy/sell order with specific conditions
         (target only required if a condition is in place)
         """
+        self._check_market(market, online=True)
 
         if tradetype in ('BUY', 'buy'):
             method = "tradebuy"
@@ -397,7 +659,9 @@ class Bittrex(object):
         :return: Currently withdrawal history
         :rtype : dict
         """
-        if not currency:
+        if currency:
+            self._check_currency(currency)
+        else:
             currency = ""
         return self.__call__('balance', "getwithdrawalhistory",
                              {"currencyname": currency})
@@ -414,7 +678,9 @@ class Bittrex(object):
         :return: Currently deposits history
         :rtype : dict
         """
-        if not currency:
+        if currency:
+            self._check_currency(currency)
+        else:
             currency = ""
         return self.__call__('balance', "getdeposithistory",
                              {"currencyname": currency})
@@ -431,7 +697,9 @@ class Bittrex(object):
         :return: Currently pending deposits
         :rtype : dict
         """
-        if not currency:
+        if currency:
+            self._check_currency(currency)
+        else:
             currency = ""
         return self.__call__('balance', "getpendingdeposits",
                              {"currencyname": currency})
@@ -446,6 +714,7 @@ class Bittrex(object):
         :return: Deposit address
         :rtype : dict
         """
+        self._check_currency(currency)
         return self.__call__('balance', "getdepositaddress",
                              {"currencyname": currency})
 
@@ -459,6 +728,72 @@ class Bittrex(object):
         :return: Deposit address
         :rtype : dict
         """
+        self._check_currency(currency)
         return self.__call__('balance', "generatedepositaddress",
                              {"currencyname": currency})
 
+
+class PreparedCommand(object):
+    """
+    Precomputed request for a single command, created
+    by Bittrex.prepare(). Calling it sends the request and
+    returns the decoded json api message.
+
+    Static args are encoded once. Per call args, if any,
+    are appended after them.
+    """
+    def __init__(self, client, group, command, args=None):
+        self.client = client
+        self.command = command
+        args = _urlencode(args or {})
+
+        if command in PRIVATE_COMMANDS:
+            if not client.api_key or not client.api_secret:
+                raise BittrexError("Key and Secret needed!")
+            from hmac import new as _new
+            from hashlib import sha512 as _sha512
+            self.private = True
+            self._prefix = BASE_URL + 'key/{}/{}?'.format(group, command)
+            self._suffix = '&' + _urlencode({'apikey': client.api_key})
+            self._hmac = _new(client.api_secret.encode('utf-8'),
+                              digestmod=_sha512)
+        elif command in PUBLIC_COMMANDS:
+            self.private = False
+            self._prefix = BASE_URL + 'pub/{}/{}?'.format(group, command)
+        else:
+            raise BittrexError("Invalid Command: %s" % command)
+
+        if args:
+            self._prefix += args + '&'
+
+    def __call__(self, args=None):
+        """
+        :param args: Per call options (not modified)
+        :type args: dict
+
+        :return: JSON response from Bittrex
+        :rtype : dict
+        """
+        return self.client._request(partial(self._sign, args),
+                                    command=self.command)
+
+    def _sign(self, args=None):
+        """Returns url and headers of one attempt."""
+        url = self._prefix
+        if args:
+            url += _urlencode(args) + '&'
+
+        if not self.private:
+            if url[-1] == '&':
+                url = url[:-1]
+            if self.client.debug_endpoint == True:
+                print(url)
+            return url, {}
+
+        url += 'nonce=%d' % self.client.nonce + self._suffix
+        if self.client.debug_endpoint == True:
+            print(url)
+
+        sign = self._hmac.copy()
+        sign.update(url.encode('utf-8'))
+        return url, {'apisign': sign.hexdigest()}
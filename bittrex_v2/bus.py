@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Shared memory market data bus.
+
+One process polls Bittrex through a MarketDataPublisher and writes
+the newest snapshot (summaries, tickers and order books) into a
+named shared memory segment. Any number of local processes read it
+through MarketDataReader without network I/O.
+
+Segment layout (little-endian):
+
+    magic (8s) | sequence (uint64) | length (uint64) | payload
+
+Writes follow a seqlock protocol: the sequence is odd while the
+payload is being written and even once it is complete, readers
+retry when the sequence is odd or has changed while copying.
+"""
+
+import pickle
+import struct
+from time import time, sleep, monotonic
+from multiprocessing import shared_memory
+
+from .bittrex import Bittrex, BittrexError
+
+
+MAGIC = b'BTRXBUS1'
+HEADER = struct.Struct('<8sQQ')
+_SEQ = struct.Struct('<Q')
+_SEQ_OFFSET = 8
+
+DEFAULT_NAME = 'bittrex_v2'
+DEFAULT_SIZE = 64 * 1024 * 1024
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers attached segments in the resource
+        # tracker, which would unlink them when the reader exits.
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class MarketDataPublisher(object):
+    """
+    Polls Bittrex and publishes snapshots to shared memory.
+
+    :param client: Client used to poll (default == Bittrex())
+    :type client: Bittrex
+
+    :param name: Shared memory segment name (default == 'bittrex_v2')
+    :type name: str
+
+    :param size: Segment size in bytes (default == 64 MiB)
+    :type size: int
+
+    :param markets: Markets whose order books are published
+    :type markets: list
+
+    :param compact: Publish order books as 'OrderBook' arrays
+        (default == True)
+    :type compact: bool
+    """
+    def __init__(self, client=None, name=DEFAULT_NAME, size=DEFAULT_SIZE,
+                 markets=(), compact=True):
+        self.client = client or Bittrex()
+        self.markets = list(markets)
+        self.compact = compact
+        self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                              size=size)
+        self._seq = 0
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, self._seq, 0)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, snapshot):
+        """
+        Writes a snapshot to the segment.
+
+        :param snapshot: Any picklable object
+        """
+        payload = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+        if HEADER.size + len(payload) > self.shm.size:
+            raise BittrexError("Snapshot of %d bytes doesn't fit in %s"
+                               % (len(payload), self.name))
+        buf = self.shm.buf
+        self._seq += 1
+        _SEQ.pack_into(buf, _SEQ_OFFSET, self._seq)
+        buf[HEADER.size:HEADER.size + len(payload)] = payload
+        HEADER.pack_into(buf, 0, MAGIC, self._seq, len(payload))
+        self._seq += 1
+        _SEQ.pack_into(buf, _SEQ_OFFSET, self._seq)
+
+    def poll(self):
+        """
+        Fetches summaries and configured order books.
+
+        :return: {'time', 'summaries', 'tickers', 'orderbooks'}
+        :rtype : dict
+        """
+        summaries = self.client.get_market_summaries()
+        if not summaries.get('success'):
+            raise BittrexError(summaries.get('message'))
+        summaries = summaries['result']
+
+        tickers = {}
+        for market in summaries:
+            summary = market['Summary']
+            tickers[summary['MarketName']] = {'Bid': summary['Bid'],
+                                              'Ask': summary['Ask'],
+                                              'Last': summary['Last']}
+
+        orderbooks = {}
+        for market in self.markets:
+            book = self.client.get_market_orderbook(market,
+                                                    compact=self.compact)
+            if book.get('success'):
+                orderbooks[market] = book['result']
+
+        return {'time': time(), 'summaries': summaries,
+                'tickers': tickers, 'orderbooks': orderbooks}
+
+    def run(self, interval=1.0, stop=None):
+        """
+        Polls and publishes every <interval> seconds until
+        <stop> (a threading/multiprocessing Event) is set.
+        """
+        while stop is None or not stop.is_set():
+            started = time()
+            self.publish(self.poll())
+            wait = interval - (time() - started)
+            if wait > 0:
+                if stop is not None:
+                    stop.wait(wait)
+                else:
+                    sleep(wait)
+
+    def close(self, unlink=True):
+        """Detaches from the segment and removes it by default."""
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MarketDataReader(object):
+    """
+    Reads snapshots published by a MarketDataPublisher. The
+    decoded snapshot is cached until a new version is published.
+
+    :param name: Shared memory segment name (default == 'bittrex_v2')
+    :type name: str
+
+    :param timeout: Seconds read() waits for a write in progress
+        before raising 'BittrexError', so a publisher dying in the
+        middle of a write doesn't hang readers (default == 1.0)
+    :type timeout: float
+    """
+    def __init__(self, name=DEFAULT_NAME, timeout=1.0):
+        self.timeout = timeout
+        self.shm = _attach(name)
+        if bytes(self.shm.buf[:len(MAGIC)]) != MAGIC:
+            self.shm.close()
+            raise BittrexError("Invalid market data segment: %s" % name)
+        self._seq = 0
+        self._snapshot = None
+
+    @property
+    def version(self):
+        """Sequence number of the newest complete snapshot."""
+        return _SEQ.unpack_from(self.shm.buf, _SEQ_OFFSET)[0] & ~1
+
+    def read(self):
+        """
+        Returns the newest snapshot, or None if nothing
+        has been published yet.
+        """
+        buf = self.shm.buf
+        end = None
+        while True:
+            before = _SEQ.unpack_from(buf, _SEQ_OFFSET)[0]
+            if before & 1:
+                if end is None:
+                    end = monotonic() + self.timeout
+                elif monotonic() > end:
+                    raise BittrexError("Market data write not completed "
+                                       "in %s sec" % self.timeout)
+                sleep(0)
+                continue
+            if before == self._seq:
+                return self._snapshot
+            length = HEADER.unpack_from(buf, 0)[2]
+            payload = bytes(buf[HEADER.size:HEADER.size + length])
+            if _SEQ.unpack_from(buf, _SEQ_OFFSET)[0] == before:
+                break
+
+        self._seq = before
+        self._snapshot = pickle.loads(payload) if length else None
+        return self._snapshot
+
+    def ticker(self, market):
+        """Returns {'Bid', 'Ask', 'Last'} of a market or None."""
+        snapshot = self.read()
+        return snapshot['tickers'].get(market) if snapshot else None
+
+    def orderbook(self, market):
+        """Returns the newest published order book of a market or None."""
+        snapshot = self.read()
+        return snapshot['orderbooks'].get(market) if snapshot else None
+
+    def close(self):
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Command line exporter for account history and market ticks.
+
+    bittrex_v2 orders      -o orders.csv
+    bittrex_v2 deposits    -o deposits.jsonl --currency BTC
+    bittrex_v2 withdrawals -o withdrawals.parquet
+    bittrex_v2 ticks BTC-ETH BTC-LTC -i oneMin -o ticks/ -f parquet
+
+Responses are parsed while they are downloaded and rows are written
+in batches (one row group each for Parquet), tick
+downloads run concurrently, are written one market at a time and
+record finished markets in a checkpoint file, so an interrupted
+export resumes where it stopped. Credentials for private commands
+are read from --key/--secret or BITTREX_API_KEY/BITTREX_API_SECRET.
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+from contextlib import nullcontext
+from decimal import Decimal
+from threading import Lock
+from time import perf_counter
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import __version__
+from .bittrex import Bittrex, BittrexError
+from .deadline import Deadline, submit
+
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+EXTENSIONS = {'csv': 'csv', 'jsonl': 'jsonl', 'parquet': 'parquet'}
+HISTORY_COMMANDS = {
+    'orders': ('orders', 'getorderhistory'),
+    'deposits': ('balance', 'getdeposithistory'),
+    'withdrawals': ('balance', 'getwithdrawalhistory'),
+    }
+
+
+def _plain(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+class CSVWriter(object):
+    """Writes rows as CSV, header taken from the first row."""
+    def __init__(self, path):
+        self._file = (sys.stdout if path == '-'
+                      else open(path, 'w', newline='', encoding='utf-8'))
+        self._writer = None
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, list(rows[0]),
+                                          extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class JSONLinesWriter(object):
+    """Writes one json object per line."""
+    def __init__(self, path):
+        self._file = (sys.stdout if path == '-'
+                      else open(path, 'w', encoding='utf-8'))
+
+    def write(self, rows):
+        self._file.writelines(json.dumps(row, default=_plain) + '\n'
+                              for row in rows)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class ParquetWriter(object):
+    """Writes every batch as a Parquet row group (needs pyarrow)."""
+    def __init__(self, path):
+        if path == '-':
+            raise BittrexError("Parquet can't be written to stdout")
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise BittrexError("Parquet output needs 'pyarrow' installed")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self._writer = None
+
+    def write(self, rows):
+        if not rows:
+            return
+        columns = {key: [_plain(row.get(key)) for row in rows]
+                   for key in rows[0]}
+        if self._writer is None:
+            table = self._pa.table(columns)
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = self._pa.table(columns, schema=self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+WRITERS = {'csv': CSVWriter, 'jsonl': JSONLinesWriter,
+           'parquet': ParquetWriter}
+
+
+class Progress(object):
+    """Thread safe row counter printing throughput to stderr."""
+    def __init__(self, quiet=False, interval=1.0):
+        self.quiet = quiet
+        self.interval = interval
+        self.rows = 0
+        self.tasks = 0
+        self.total = None
+        self._start = self._last = perf_counter()
+        self._lock = Lock()
+
+    def add(self, rows=0, tasks=0):
+        with self._lock:
+            self.rows += rows
+            self.tasks += tasks
+            now = perf_counter()
+            if now - self._last >= self.interval:
+                self._last = now
+                self.report()
+
+    def report(self, end='\r'):
+        if self.quiet:
+            return
+        elapsed = max(perf_counter() - self._start, 1e-9)
+        tasks = ''
+        if self.total is not None:
+            tasks = ' | %d/%d markets' % (self.tasks, self.total)
+        sys.stderr.write('%d rows | %.1f s | %.0f rows/s%s%s' %
+                         (self.rows, elapsed, self.rows / elapsed,
+                          tasks, end))
+        sys.stderr.flush()
+
+
+def write_rows(rows, writer, batch_size, progress):
+    """Writes an iterable of rows to writer in batches of batch_size."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        writer.write(batch)
+        progress.add(rows=len(batch))
+
+
+def export_history(client, command, output, fmt='csv', currency=None,
+                   batch_size=10000, progress=None):
+    """
+    Exports orders, deposits or withdrawals history.
+
+    :param command: 'orders', 'deposits' or 'withdrawals'
+    :type command: str
+    """
+    progress = progress or Progress(quiet=True)
+    group, name = HISTORY_COMMANDS[command]
+    args = None if command == 'orders' else {'currencyname': currency or ''}
+    rows = client.stream(group, name, args)
+    writer = WRITERS[fmt](output)
+    try:
+        write_rows(rows, writer, batch_size, progress)
+    finally:
+        writer.close()
+    return progress.rows
+
+
+class Checkpoint(object):
+    """Set of finished tasks persisted as json after every update."""
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self._lock = Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = set(json.load(f))
+
+    def add(self, task):
+        with self._lock:
+            self.done.add(task)
+            if self.path:
+                tmp = self.path + '.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(sorted(self.done), f)
+                os.replace(tmp, self.path)
+
+
+def export_ticks(client, markets, interval, output_dir, fmt='csv',
+                 checkpoint=None, workers=4, batch_size=10000,
+                 progress=None):
+    """
+    Exports ticks of many markets to <output_dir>/<market>_<interval>.<ext>.
+
+    Markets listed in the checkpoint file are skipped and every
+    market finished is added to it. Files are written under a
+    temporary name and renamed when complete.
+
+    :return: Rows written
+    :rtype : int
+    """
+    progress = progress or Progress(quiet=True)
+    checkpoint = Checkpoint(checkpoint)
+    pending = [m for m in markets if m not in checkpoint.done]
+    progress.total = len(markets)
+    progress.add(tasks=len(markets) - len(pending))
+    os.makedirs(output_dir, exist_ok=True)
+
+    def export(market):
+        rows = client.stream('market', 'GetTicks',
+                             {'marketName': market,
+                              'tickInterval': interval})
+        path = os.path.join(output_dir, '%s_%s.%s' %
+                            (market, interval, EXTENSIONS[fmt]))
+        tmp = path + '.part'
+        writer = WRITERS[fmt](tmp)
+        try:
+            write_rows(rows, writer, batch_size, progress)
+        finally:
+            writer.close()
+        os.replace(tmp, path)
+        checkpoint.add(market)
+        progress.add(tasks=1)
+
+    with ThreadPoolExecutor(workers) as executor:
+        for future in as_completed([submit(executor, export, market)
+                                    for market in pending]):
+            future.result()
+    return progress.rows
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='bittrex_v2',
+        description='Export Bittrex history and ticks.')
+    parser.add_argument('--version', action='version', version=__version__)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-f', '--format', choices=FORMATS,
+                        help='output format (default: from extension '
+                             'or csv)')
+    common.add_argument('--batch-size', type=int, default=10000,
+                        help='rows per write / row group (default: 10000)')
+    common.add_argument('--timeout', type=float, default=30,
+                        help='request timeout in seconds (default: 30)')
+    common.add_argument('--deadline', type=float,
+                        help='abandon the export after this many seconds')
+    common.add_argument('--retries', type=int, default=2,
+                        help='retries of failed requests (default: 2)')
+    common.add_argument('-q', '--quiet', action='store_true',
+                        help="don't report progress")
+
+    commands = parser.add_subparsers(dest='command')
+    for name in HISTORY_COMMANDS:
+        sub = commands.add_parser(name, parents=[common],
+                                  help='export %s history' % name)
+        sub.add_argument('-o', '--output', default='-',
+                         help='output file (default: stdout)')
+        sub.add_argument('--key', default=os.environ.get('BITTREX_API_KEY'))
+        sub.add_argument('--secret',
+                         default=os.environ.get('BITTREX_API_SECRET'))
+        if name != 'orders':
+            sub.add_argument('--currency', help='only this currency')
+
+    sub = commands.add_parser('ticks', parents=[common],
+                              help='export ticks of many markets')
+    sub.add_argument('markets', nargs='+', help='ex: BTC-ETH')
+    sub.add_argument('-i', '--interval', default='oneMin',
+                     choices=('oneMin', 'fiveMin', 'thirtyMin',
+                              'hour', 'day'))
+    sub.add_argument('-o', '--output', default='.',
+                     help='output directory (default: .)')
+    sub.add_argument('-w', '--workers', type=int, default=4,
+                     help='concurrent downloads (default: 4)')
+    sub.add_argument('--checkpoint',
+                     help='file recording finished markets, used to '
+                          'resume (default: <output>/.checkpoint-<interval>)')
+    return parser
+
+
+def main(argv=None):
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.print_help()
+        return 2
+
+    fmt = args.format
+    if fmt is None:
+        ext = os.path.splitext(args.output)[1].lstrip('.')
+        fmt = ext if ext in FORMATS else 'csv'
+    progress = Progress(quiet=args.quiet)
+
+    deadline = Deadline(args.deadline) if args.deadline else nullcontext()
+    try:
+        with deadline:
+            if args.command == 'ticks':
+                client = Bittrex(timeout=args.timeout, retries=args.retries)
+                checkpoint = args.checkpoint or os.path.join(
+                    args.output, '.checkpoint-%s' % args.interval)
+                export_ticks(client, args.markets, args.interval,
+                             args.output, fmt, checkpoint, args.workers,
+                             args.batch_size, progress)
+            else:
+                client = Bittrex(args.key, args.secret, timeout=args.timeout,
+                                 retries=args.retries)
+                export_history(client, args.command, args.output, fmt,
+                               getattr(args, 'currency', None),
+                               args.batch_size, progress)
+    except (BittrexError, OSError) as err:
+        progress.report(end='\n')
+        sys.stderr.write('bittrex_v2: error: %s\n' % (err.args[0]
+                                                      if err.args else err))
+        return 1
+    progress.report(end='\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
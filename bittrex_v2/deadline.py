@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Deadlines shared by every request made inside a block:
+
+>>> with Deadline(2.5):
+...     b.cancel(uuid)
+...     b.get_open_orders('BTC-ETH')
+
+Request timeouts are capped to the time left, retries stop when
+it is exhausted and 'DeadlineExceeded' is raised instead of
+starting new work. The deadline is stored in a context variable,
+so it follows the code into helpers that copy the context to
+worker threads (BittrexPool, the export command line tool).
+"""
+
+from contextvars import ContextVar, copy_context
+from time import monotonic
+
+from .bittrex import BittrexError
+
+
+_current = ContextVar('bittrex_v2_deadline', default=None)
+
+
+class DeadlineExceeded(BittrexError):
+    """Raised when the active deadline has no time left."""
+
+
+class Deadline(object):
+    """
+    Time budget for every request made inside a with block.
+    Nested deadlines can shorten but never extend outer ones.
+
+    :param seconds: Budget in seconds
+    :type seconds: float
+    """
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = monotonic() + seconds
+        self._token = None
+
+    def remaining(self):
+        """Seconds left, never negative."""
+        return max(0.0, self.expires - monotonic())
+
+    @property
+    def expired(self):
+        return monotonic() >= self.expires
+
+    def check(self):
+        """Raises 'DeadlineExceeded' if no time is left."""
+        if self.expired:
+            raise DeadlineExceeded("Deadline of %ss exceeded" % self.seconds)
+
+    def __enter__(self):
+        outer = _current.get()
+        if outer is not None and outer.expires < self.expires:
+            self.expires = outer.expires
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        self._token = None
+
+
+def current():
+    """Returns the active Deadline or None."""
+    return _current.get()
+
+
+def remaining():
+    """Seconds left of the active deadline, None without one."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def check():
+    """Raises 'DeadlineExceeded' if the active deadline expired."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def submit(executor, fn, *args, **kwargs):
+    """
+    executor.submit() running fn in a copy of the current
+    context, so worker threads see the active deadline.
+    """
+    return executor.submit(copy_context().run, fn, *args, **kwargs)
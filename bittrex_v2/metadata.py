@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Event
+
+from .bittrex import BittrexError
+
+
+class MetadataIndex(object):
+    """
+    Markets, currencies and wallet status indexed for O(1) lookups,
+    loaded from get_markets(), get_currencies() and get_wallet_health().
+
+    Passed to a client as Bittrex(metadata=index), market and currency
+    arguments are validated locally and orders or withdrawals on
+    offline wallets are rejected before any request is sent.
+
+    :param client: Client used to load metadata
+    :type client: Bittrex
+
+    :param refresh_interval: Seconds between background refreshes
+        (default == None, refresh() must be called explicitly)
+    :type refresh_interval: float
+    """
+    def __init__(self, client, refresh_interval=None):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.markets = {}
+        self.currencies = {}
+        self.health = {}
+        self._by_base = {}
+        self._by_quote = {}
+        self._stop = Event()
+        self._thread = None
+        if refresh_interval:
+            self.refresh()
+            self.start()
+
+    def refresh(self):
+        """Reloads metadata, indexes are swapped when complete."""
+        def result(ret):
+            if not ret.get('success'):
+                raise BittrexError(ret.get('message'))
+            return ret['result'] or []
+
+        markets, by_base, by_quote = {}, {}, {}
+        for market in result(self.client.get_markets()):
+            name = market['MarketName']
+            markets[name] = market
+            by_base.setdefault(market['BaseCurrency'], []).append(name)
+            by_quote.setdefault(market['MarketCurrency'], []).append(name)
+
+        currencies = {c['Currency']: c
+                      for c in result(self.client.get_currencies())}
+        health = {h['Health']['Currency']: h['Health']
+                  for h in result(self.client.get_wallet_health())}
+
+        (self.markets, self.currencies, self.health,
+         self._by_base, self._by_quote) = (markets, currencies, health,
+                                           by_base, by_quote)
+
+    def start(self):
+        """Starts refreshing every refresh_interval seconds."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the last good metadata
+                pass
+
+    def market(self, name):
+        """Returns getmarkets info of a market or None."""
+        return self.markets.get(name)
+
+    def currency(self, code):
+        """Returns getcurrencies info of a currency or None."""
+        return self.currencies.get(code)
+
+    def markets_by_base(self, base):
+        """Market names with a given base currency (ex: BTC)."""
+        return self._by_base.get(base, [])
+
+    def markets_by_quote(self, quote):
+        """Market names trading a given market currency (ex: ETH)."""
+        return self._by_quote.get(quote, [])
+
+    def wallet_online(self, code):
+        """
+        False if the currency or its wallet are reported inactive.
+
+        :rtype : bool
+        """
+        currency = self.currencies.get(code)
+        if currency is not None and not currency.get('IsActive', True):
+            return False
+        health = self.health.get(code)
+        return health is None or bool(health.get('IsActive', True))
+
+    def market_online(self, name):
+        """True if a market is active and both its wallets are online."""
+        market = self.markets.get(name)
+        return (market is not None and market.get('IsActive', True)
+                and self.wallet_online(market['BaseCurrency'])
+                and self.wallet_online(market['MarketCurrency']))
+
+    def online_markets(self):
+        """Market names whose wallets are online."""
+        return [name for name in self.markets if self.market_online(name)]
+
+    def check_market(self, name, online=False):
+        """
+        Raises 'BittrexError' if a market doesn't exist or, with
+        online == True, if it is inactive or a wallet is offline.
+        Nothing is checked until metadata has been loaded.
+        """
+        if self.markets and name not in self.markets:
+            raise BittrexError("Invalid market: %s" % name)
+        if online and self.markets and not self.market_online(name):
+            raise BittrexError("Market offline: %s" % name)
+
+    def check_currency(self, code, online=False):
+        """
+        Raises 'BittrexError' if a currency doesn't exist or, with
+        online == True, if its wallet is offline.
+        Nothing is checked until metadata has been loaded.
+        """
+        if self.currencies and code not in self.currencies:
+            raise BittrexError("Invalid currency: %s" % code)
+        if online and not self.wallet_online(code):
+            raise BittrexError("Wallet offline: %s" % code)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compact order books and liquidity metrics.
+
+Order books are stored as paired 'array.array' columns of floats
+(rates and quantities per side) instead of lists of dicts, which
+keeps hundreds of books cheap in memory and fast to scan.
+"""
+
+from array import array
+
+
+class OrderBook(object):
+    """
+    Order book of a market as paired rate/quantity arrays.
+    Bids are sorted by rate descending and asks ascending.
+
+    :param market: String literal for the market (ex: BTC-LTC)
+    :type market: str
+    """
+    __slots__ = ('market', 'bid_rates', 'bid_quantities',
+                 'ask_rates', 'ask_quantities')
+
+    def __init__(self, market, bid_rates=(), bid_quantities=(),
+                 ask_rates=(), ask_quantities=()):
+        self.market = market
+        self.bid_rates = array('d', bid_rates)
+        self.bid_quantities = array('d', bid_quantities)
+        self.ask_rates = array('d', ask_rates)
+        self.ask_quantities = array('d', ask_quantities)
+
+    @classmethod
+    def from_result(cls, market, result):
+        """
+        Builds an OrderBook from the 'result' of get_market_orderbook().
+
+        :param result: {'buy': [{'Quantity', 'Rate'}, ...], 'sell': [...]}
+        :type result: dict
+        """
+        buy = sorted(result.get('buy') or (), key=lambda o: -o['Rate'])
+        sell = sorted(result.get('sell') or (), key=lambda o: o['Rate'])
+        return cls(market,
+                   [o['Rate'] for o in buy], [o['Quantity'] for o in buy],
+                   [o['Rate'] for o in sell], [o['Quantity'] for o in sell])
+
+    def __repr__(self):
+        return '<OrderBook %s bids=%d asks=%d>' % (
+            self.market, len(self.bid_rates), len(self.ask_rates))
+
+    @property
+    def best_bid(self):
+        return self.bid_rates[0] if self.bid_rates else None
+
+    @property
+    def best_ask(self):
+        return self.ask_rates[0] if self.ask_rates else None
+
+    @property
+    def mid(self):
+        if not self.bid_rates or not self.ask_rates:
+            return None
+        return (self.bid_rates[0] + self.ask_rates[0]) / 2
+
+    @property
+    def spread(self):
+        if not self.bid_rates or not self.ask_rates:
+            return None
+        return self.ask_rates[0] - self.bid_rates[0]
+
+    def depth(self, pct):
+        """
+        Returns the base currency volume (rate * quantity) resting
+        within pct percent of the mid price on each side.
+
+        :rtype : tuple (bid_depth, ask_depth)
+        """
+        mid = self.mid
+        if mid is None:
+            return (0.0, 0.0)
+        low, high = mid * (1 - pct / 100.0), mid * (1 + pct / 100.0)
+        return (_side_depth(self.bid_rates, self.bid_quantities,
+                            lambda rate: rate >= low),
+                _side_depth(self.ask_rates, self.ask_quantities,
+                            lambda rate: rate <= high))
+
+    def slippage(self, side, notional):
+        """
+        Relative difference between the average fill price of a
+        market order for <notional> base currency and the best price.
+
+        :param side: 'buy' (walks asks) or 'sell' (walks bids)
+        :type side: str
+
+        :param notional: Order size in base currency
+        :type notional: float
+
+        :return: Slippage as fraction of best price or None if
+            the book can't fill the order
+        :rtype : float
+        """
+        if side == 'buy':
+            rates, quantities = self.ask_rates, self.ask_quantities
+        else:
+            rates, quantities = self.bid_rates, self.bid_quantities
+        if not rates:
+            return None
+
+        remaining, filled = notional, 0.0
+        for rate, quantity in zip(rates, quantities):
+            cost = rate * quantity
+            if cost >= remaining:
+                filled += remaining / rate
+                remaining = 0.0
+                break
+            filled += quantity
+            remaining -= cost
+        if remaining > 0:
+            return None
+        return abs(notional / filled / rates[0] - 1)
+
+
+def _side_depth(rates, quantities, inside):
+    total = 0.0
+    # Sides are sorted from the best rate, stop at the first one outside
+    for rate, quantity in zip(rates, quantities):
+        if not inside(rate):
+            break
+        total += rate * quantity
+    return total
+
+
+def book_metrics(books, depth_pct=1.0, notional=1.0):
+    """
+    Computes liquidity metrics for many order books in one pass.
+
+    :param books: OrderBooks by market or iterable of OrderBooks
+    :type books: dict or iterable
+
+    :param depth_pct: Distance from mid price, in percent,
+        used for depth (default == 1.0)
+    :type depth_pct: float
+
+    :param notional: Order size in base currency used
+        for slippage (default == 1.0)
+    :type notional: float
+
+    :return: {market: {'spread', 'spread_pct', 'bid_depth',
+             'ask_depth', 'buy_slippage', 'sell_slippage'}}
+    :rtype : dict
+    """
+    if isinstance(books, dict):
+        books = books.values()
+
+    metrics = {}
+    for book in books:
+        spread, mid = book.spread, book.mid
+        bid_depth, ask_depth = book.depth(depth_pct)
+        metrics[book.market] = {
+            'spread': spread,
+            'spread_pct': spread / mid * 100 if mid else None,
+            'bid_depth': bid_depth,
+            'ask_depth': ask_depth,
+            'buy_slippage': book.slippage('buy', notional),
+            'sell_slippage': book.slippage('sell', notional),
+            }
+    return metrics
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Paper trading exchange.
+
+PaperExchange is a transport, so every Bittrex method works against
+it unchanged while orders are matched locally:
+
+>>> paper = PaperExchange(balances={'BTC': 1})
+>>> b = Bittrex('paper', 'paper', transport=paper)
+>>> paper.load_orderbook('BTC-ETH', real.get_market_orderbook('BTC-ETH'))
+>>> b.place_order('buy', 'BTC-ETH', 1, '0.05', 'LIMIT', 'GOOD_TIL_CANCELLED')
+
+Limit orders fill against the loaded order book snapshot, consuming
+its liquidity, and resting orders are matched again every time a
+new snapshot is loaded. Order books can also be taken from another
+transport (live or ReplayTransport), in which case every
+get_market_orderbook() call through the paper exchange loads the
+returned snapshot.
+"""
+
+import json
+from uuid import uuid4
+from decimal import Decimal, ROUND_DOWN, ROUND_UP
+from threading import RLock
+from collections import defaultdict
+from datetime import datetime, timezone
+from time import time
+from urllib.parse import urlsplit, parse_qsl
+
+from .transport import Response
+
+
+_ZERO = Decimal(0)
+# Bittrex amounts and rates have 8 decimals, quantized values survive
+# the float round trip of the json replies exactly
+_SATOSHI = Decimal('0.00000001')
+_TIME_IN_EFFECT = ('GOOD_TIL_CANCELLED', 'IMMEDIATE_OR_CANCEL',
+                   'FILL_OR_KILL')
+
+
+def _decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _amount(value, rounding=ROUND_DOWN):
+    return _decimal(value).quantize(_SATOSHI, rounding)
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(value)
+
+
+class PaperExchange(object):
+    """
+    Simulated exchange backend with balances, open orders and fills.
+
+    :param balances: Initial balances {currency: amount}
+    :type balances: dict
+
+    :param fee: Commission rate applied to every fill (default == 0.0025)
+    :type fee: Decimal, str or float
+
+    :param transport: Transport used for public commands other than
+        loaded order books (default == None, not served)
+    :type transport: callable
+
+    :param clock: Function returning unix time, used for order
+        timestamps (default == time.time)
+    :type clock: callable
+    """
+    def __init__(self, balances=None, fee='0.0025', transport=None,
+                 clock=time):
+        self.fee = _decimal(fee)
+        self.transport = transport
+        self.clock = clock
+        self.balances = defaultdict(Decimal)
+        self.reserved = defaultdict(Decimal)
+        for currency, amount in (balances or {}).items():
+            self.balances[currency] = _amount(amount)
+        self.books = {}
+        self.orders = {}
+        self.open_orders = {}
+        # Funds still reserved by every open order {uuid: amount}
+        self._holds = {}
+        self._lock = RLock()
+        self._handlers = {
+            'tradebuy': self._place,
+            'tradesell': self._place,
+            'tradecancel': self._cancel,
+            'getorder': self._get_order,
+            'getopenorders': self._get_open_orders,
+            'getorderhistory': self._get_order_history,
+            'getbalance': self._get_balance,
+            'getbalances': self._get_balances,
+            }
+
+    """ ###########################################
+        #############  ORDER BOOKS  ###############
+        ###########################################
+    """
+    def load_orderbook(self, market, book):
+        """
+        Replaces the order book of a market and matches resting
+        orders against it.
+
+        :param book: get_market_orderbook() response, its 'result'
+            or a 'bittrex_v2.orderbook.OrderBook'
+        :type book: dict or OrderBook
+        """
+        if hasattr(book, 'bid_rates'):
+            buy = zip(book.bid_rates, book.bid_quantities)
+            sell = zip(book.ask_rates, book.ask_quantities)
+        else:
+            book = book.get('result', book)
+            buy = ((o['Rate'], o['Quantity']) for o in book.get('buy') or ())
+            sell = ((o['Rate'], o['Quantity']) for o in book.get('sell') or ())
+        with self._lock:
+            self.books[market] = {
+                'buy': sorted(([_amount(r), _amount(q)] for r, q in buy),
+                              key=lambda level: -level[0]),
+                'sell': sorted(([_amount(r), _amount(q)] for r, q in sell),
+                               key=lambda level: level[0]),
+                }
+            for order in [o for o in self.open_orders.values()
+                          if o['Exchange'] == market]:
+                self._match(order)
+
+    def _book(self, market):
+        if market not in self.books and self.transport is not None:
+            self._forward('market', 'getmarketorderbook',
+                          {'marketname': market})
+        return self.books.get(market)
+
+    """ ###########################################
+        ###############  TRANSPORT  ###############
+        ###########################################
+    """
+    def __call__(self, url, headers, timeout):
+        parts = urlsplit(url)
+        access, group, command = parts.path.rstrip('/').split('/')[-3:]
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+
+        with self._lock:
+            if access == 'key':
+                handler = self._handlers.get(command)
+                if handler is None:
+                    return self._reply(None, False, 'NOT_SUPPORTED')
+                return handler(command, params)
+
+            market = params.get('marketname') or params.get('marketName')
+            if command == 'getmarketorderbook' and self.transport is None:
+                book = self.books.get(market)
+                if book is None:
+                    return self._reply(None, False, 'INVALID_MARKET')
+                return self._reply({side: [{'Quantity': q, 'Rate': r}
+                                           for r, q in levels]
+                                    for side, levels in book.items()})
+        if self.transport is None:
+            return Response(404, b'')
+        return self._forward(group, command, params, url, headers, timeout)
+
+    def _forward(self, group, command, params, url=None, headers=None,
+                 timeout=None):
+        if url is None:
+            from .bittrex import BASE_URL
+            from urllib.parse import urlencode
+            url = BASE_URL + 'pub/%s/%s?%s' % (group, command,
+                                              urlencode(params))
+        ret = self.transport(url, headers or {}, timeout)
+        if command == 'getmarketorderbook' and ret.status_code == 200:
+            book = json.loads(ret.content, parse_float=Decimal)
+            if book.get('success') and book.get('result'):
+                self.load_orderbook(params.get('marketname'), book['result'])
+        return ret
+
+    def _reply(self, result, success=True, message=''):
+        body = json.dumps({'success': success, 'message': message,
+                           'result': result}, default=_default)
+        return Response(200, body.encode('utf-8'))
+
+    def _timestamp(self):
+        return datetime.fromtimestamp(self.clock(), timezone.utc) \
+                       .strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]
+
+    """ ###########################################
+        ################  ORDERS  #################
+        ###########################################
+    """
+    def _place(self, command, params):
+        market = params.get('marketname', '')
+        try:
+            base, quote = market.split('-', 1)
+            quantity = _amount(params['quantity'])
+            rate = _amount(params['rate'])
+        except (ValueError, KeyError, ArithmeticError):
+            return self._reply(None, False, 'INVALID_ORDER')
+        if quantity <= 0 or rate <= 0:
+            return self._reply(None, False, 'INVALID_ORDER')
+        if params.get('ordertype', 'LIMIT') != 'LIMIT':
+            return self._reply(None, False, 'ORDERTYPE_NOT_SUPPORTED')
+        if params.get('conditiontype', 'NONE') not in ('NONE', ''):
+            return self._reply(None, False, 'CONDITION_NOT_SUPPORTED')
+        time_in_effect = params.get('timeineffect', 'GOOD_TIL_CANCELLED')
+        if time_in_effect not in _TIME_IN_EFFECT:
+            return self._reply(None, False, 'INVALID_TIME_IN_EFFECT')
+
+        buy = command == 'tradebuy'
+        currency = base if buy else quote
+        reserve = self._reserve(buy, quantity, rate)
+        if self.balances[currency] - self.reserved[currency] < reserve:
+            return self._reply(None, False, 'INSUFFICIENT_FUNDS')
+        if self._book(market) is None:
+            return self._reply(None, False, 'INVALID_MARKET')
+        if time_in_effect == 'FILL_OR_KILL' and \
+                self._fillable(market, buy, rate) < quantity:
+            return self._reply(None, False, 'FILL_OR_KILL_NOT_FILLED')
+
+        self.reserved[currency] += reserve
+        order = {
+            'OrderUuid': str(uuid4()),
+            'Exchange': market,
+            'Type': 'LIMIT_BUY' if buy else 'LIMIT_SELL',
+            'OrderType': 'LIMIT_BUY' if buy else 'LIMIT_SELL',
+            'Quantity': quantity,
+            'QuantityRemaining': quantity,
+            'Limit': rate,
+            'Price': _ZERO,
+            'PricePerUnit': None,
+            'CommissionPaid': _ZERO,
+            'Opened': self._timestamp(),
+            'Closed': None,
+            'IsOpen': True,
+            'CancelInitiated': False,
+            'ImmediateOrCancel': time_in_effect != 'GOOD_TIL_CANCELLED',
+            'IsConditional': False,
+            'Condition': 'NONE',
+            'ConditionTarget': None,
+            }
+        self.orders[order['OrderUuid']] = order
+        self.open_orders[order['OrderUuid']] = order
+        self._holds[order['OrderUuid']] = reserve
+        self._match(order)
+        if order['IsOpen'] and order['ImmediateOrCancel']:
+            self._close(order)
+
+        return self._reply({'OrderId': order['OrderUuid'],
+                            'MarketName': market,
+                            'MarketCurrency': quote,
+                            'BuyOrSell': 'Buy' if buy else 'Sell',
+                            'OrderType': 'LIMIT',
+                            'Quantity': quantity,
+                            'Rate': rate})
+
+    def _reserve(self, buy, quantity, rate):
+        """Funds an order of quantity at rate needs reserved."""
+        if buy:
+            return _amount(quantity * rate * (1 + self.fee), ROUND_UP)
+        return quantity
+
+    def _fillable(self, market, buy, rate):
+        levels = self.books[market]['sell' if buy else 'buy']
+        return sum(q for r, q in levels if (r <= rate if buy else r >= rate))
+
+    def _match(self, order):
+        market = order['Exchange']
+        base, quote = market.split('-', 1)
+        buy = order['Type'] == 'LIMIT_BUY'
+        levels = self.books.get(market, {}).get('sell' if buy else 'buy', [])
+        limit = order['Limit']
+
+        while levels and order['QuantityRemaining'] > 0:
+            rate, available = levels[0]
+            if (rate > limit) if buy else (rate < limit):
+                break
+            quantity = min(available, order['QuantityRemaining'])
+            # Rounded down, a fill never costs more than was reserved
+            cost = _amount(quantity * rate)
+            commission = _amount(cost * self.fee)
+            release = min(self._holds[order['OrderUuid']],
+                          self._reserve(buy, quantity, limit))
+            self._holds[order['OrderUuid']] -= release
+            if buy:
+                self.balances[base] -= cost + commission
+                self.reserved[base] -= release
+                self.balances[quote] += quantity
+            else:
+                self.balances[quote] -= quantity
+                self.reserved[quote] -= release
+                self.balances[base] += cost - commission
+
+            order['QuantityRemaining'] -= quantity
+            order['Price'] += cost
+            order['CommissionPaid'] += commission
+            order['PricePerUnit'] = _amount(order['Price'] /
+                                            (order['Quantity'] -
+                                             order['QuantityRemaining']))
+            if quantity == available:
+                levels.pop(0)
+            else:
+                levels[0][1] = available - quantity
+
+        if order['QuantityRemaining'] == 0:
+            self._close(order)
+
+    def _close(self, order):
+        """Closes an order releasing what is still reserved for it."""
+        base, quote = order['Exchange'].split('-', 1)
+        currency = base if order['Type'] == 'LIMIT_BUY' else quote
+        self.reserved[currency] -= self._holds.pop(order['OrderUuid'], _ZERO)
+        order['IsOpen'] = False
+        order['Closed'] = self._timestamp()
+        self.open_orders.pop(order['OrderUuid'], None)
+
+    def _cancel(self, command, params):
+        order = self.open_orders.get(params.get('orderId'))
+        if order is None:
+            return self._reply(None, False, 'INVALID_ORDER')
+        order['CancelInitiated'] = True
+        self._close(order)
+        return self._reply(None)
+
+    def _get_order(self, command, params):
+        order = self.orders.get(params.get('orderid'))
+        if order is None:
+            return self._reply(None, False, 'INVALID_ORDER')
+        return self._reply(order)
+
+    def _get_open_orders(self, command, params):
+        market = params.get('marketname')
+        return self._reply([o for o in self.open_orders.values()
+                            if market is None or o['Exchange'] == market])
+
+    def _get_order_history(self, command, params):
+        return self._reply([o for o in reversed(list(self.orders.values()))
+                            if not o['IsOpen']])
+
+    """ ###########################################
+        ###############  BALANCES  ################
+        ###########################################
+    """
+    def balance(self, currency):
+        """Returns {'Currency', 'Balance', 'Available', 'Pending'}."""
+        total = self.balances[currency]
+        return {'Currency': currency,
+                'Balance': total,
+                'Available': total - self.reserved[currency],
+                'Pending': _ZERO,
+                'CryptoAddress': None}
+
+    def _get_balance(self, command, params):
+        return self._reply(self.balance(params.get('currencyname')))
+
+    def _get_balances(self, command, params):
+        return self._reply([{'Balance': self.balance(currency),
+                             'Currency': {'Currency': currency}}
+                            for currency in sorted(self.balances)])
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import partial
+
+from .bittrex import Bittrex, BittrexError
+from .deadline import current, submit, DeadlineExceeded
+from .ratelimit import RateLimiter
+from .transport import RequestsTransport
+
+
+class BittrexPool(object):
+    """
+    Manages many Bittrex accounts over one shared connection pool.
+
+    Every account gets its own Bittrex client (own nonce sequence and
+    own rate budget) while all of them send requests through the
+    same requests.Session. Bittrex methods called on the pool are
+    fanned out to every account concurrently:
+
+    >>> pool = BittrexPool({'main': (key, secret), 'sub': (key2, secret2)})
+    >>> pool.get_balance('BTC')
+    {'main': {...}, 'sub': {...}}
+
+    :param accounts: Credentials by account name {name: (key, secret)}
+    :type accounts: dict
+
+    :param rate_limit: Requests per second allowed for each
+        account (default == None, no limit)
+    :type rate_limit: float
+
+    :param max_workers: Concurrent requests, also used as
+        connection pool size (default == 8)
+    :type max_workers: int
+
+    :param transport: Transport shared by all accounts
+        (default == RequestsTransport over a pooled requests.Session)
+    :type transport: callable
+
+    Other keyword arguments are passed to every Bittrex client.
+    """
+    def __init__(self, accounts=None, rate_limit=None, max_workers=8,
+                 transport=None, **kwargs):
+        self.session = None
+        if transport is None:
+            from requests import Session
+            from requests.adapters import HTTPAdapter
+            self.session = Session()
+            adapter = HTTPAdapter(pool_connections=1,
+                                  pool_maxsize=max_workers)
+            self.session.mount('https://', adapter)
+            transport = RequestsTransport(
+                self.session, max_body_size=kwargs.get('max_body_size'))
+
+        self.transport = transport
+        self.rate_limit = rate_limit
+        self._kwargs = kwargs
+        self._executor = ThreadPoolExecutor(max_workers)
+        self.clients = {}
+        for name, (key, secret) in (accounts or {}).items():
+            self.add_account(name, key, secret)
+
+    def add_account(self, name, api_key, api_secret):
+        """
+        Adds an account to the pool and returns its client.
+
+        :rtype : Bittrex
+        """
+        limiter = RateLimiter(self.rate_limit) if self.rate_limit else None
+        client = Bittrex(api_key, api_secret, transport=self.transport,
+                         rate_limit=limiter, **self._kwargs)
+        self.clients[name] = client
+        return client
+
+    def remove_account(self, name):
+        del self.clients[name]
+
+    def __getitem__(self, name):
+        return self.clients[name]
+
+    def __len__(self):
+        return len(self.clients)
+
+    def fan_out(self, method, *args, accounts=None,
+                return_exceptions=False, **kwargs):
+        """
+        Calls a Bittrex method for many accounts concurrently. An
+        active 'bittrex_v2.deadline.Deadline' applies to every call
+        and bounds the wait for results.
+
+        :param method: Bittrex method name (ex: 'get_balance')
+        :type method: str
+
+        :param accounts: Account names (default == None, all accounts)
+        :type accounts: list
+
+        :param return_exceptions: With True, errors are returned as
+            results instead of raised (default == False)
+        :type return_exceptions: bool
+
+        :return: Responses by account name
+        :rtype : dict
+        """
+        if not callable(getattr(Bittrex, method, None)) \
+                or method.startswith('_'):
+            raise BittrexError("Invalid method: %s" % method)
+        names = list(self.clients) if accounts is None else accounts
+        futures = {name: submit(self._executor,
+                                getattr(self.clients[name], method),
+                                *args, **kwargs)
+                   for name in names}
+
+        deadline = current()
+        results = {}
+        for name, future in futures.items():
+            try:
+                if deadline is None:
+                    results[name] = future.result()
+                else:
+                    try:
+                        results[name] = future.result(deadline.remaining())
+                    except TimeoutError:
+                        future.cancel()
+                        raise DeadlineExceeded("Deadline exceeded waiting "
+                                               "for %s" % name)
+            except Exception as err:
+                if not return_exceptions:
+                    raise
+                results[name] = err
+        return results
+
+    def __getattr__(self, name):
+        if not name.startswith('_') and callable(getattr(Bittrex, name, None)):
+            return partial(self.fan_out, name)
+        raise AttributeError(name)
+
+    def close(self):
+        """Stops workers and closes pooled connections."""
+        self._executor.shutdown()
+        if self.session is not None:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
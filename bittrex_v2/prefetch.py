@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Background refresh of frequently read commands.
+
+Consumers subscribe to (command, args) pairs with a freshness target
+and reads made through Bittrex methods are served from the last
+response while it is younger than that target:
+
+>>> with PrefetchScheduler(b, rate_limit=2) as prefetch:
+...     prefetch.subscribe('market', 'getmarketorderbook',
+...                        {'marketname': 'BTC-ETH'}, max_age=0.5)
+...     b.get_market_orderbook('BTC-ETH')   # no round trip when fresh
+
+A background thread refreshes entries before they get stale, most
+read first, and drops subscriptions not read for 'ttl' seconds.
+"""
+
+from copy import deepcopy
+from threading import Thread, Lock, Event
+from time import monotonic
+
+from .bittrex import BittrexError, PUBLIC_COMMANDS, PRIVATE_COMMANDS
+
+
+# Commands without side effects, the only ones that can be cached
+READ_ONLY_COMMANDS = tuple(c for c in PUBLIC_COMMANDS + PRIVATE_COMMANDS
+                           if c.startswith(('get', 'Get')))
+
+
+def _key(group, command, args, parse_float):
+    return (group, command,
+            tuple(sorted((k, str(v)) for k, v in (args or {}).items())),
+            parse_float)
+
+
+class _Entry(object):
+    """Subscription state: last response and decayed read count."""
+    __slots__ = ('group', 'command', 'args', 'parse_float', 'max_age',
+                 'ttl', 'response', 'fetched', 'score', 'accessed',
+                 'retry_at', 'error')
+
+    def __init__(self, group, command, args, parse_float, max_age, ttl, now):
+        self.group = group
+        self.command = command
+        self.args = dict(args or {})
+        self.parse_float = parse_float
+        self.max_age = max_age
+        self.ttl = ttl
+        self.response = None
+        self.fetched = None
+        self.score = 0.0
+        self.accessed = now
+        self.retry_at = now
+        self.error = None
+
+
+class PrefetchScheduler(object):
+    """
+    Keeps subscribed command responses fresh for a Bittrex client.
+
+    The scheduler attaches itself to the client, after which
+    Bittrex.__call__() (and every method using it) returns a deep copy
+    of the cached response for subscribed commands while it is fresh.
+    Stale or unsubscribed reads are sent as usual, and the response
+    of a subscribed command is cached.
+
+    Refreshes go through the client, so its rate limit still applies
+    to them; 'rate_limit' additionally bounds the share of the budget
+    spent prefetching.
+
+    :param client: Client whose reads are served
+    :type client: Bittrex
+
+    :param rate_limit: Refreshes per second allowed or a
+        'bittrex_v2.ratelimit.RateLimiter' (default == None, no limit)
+    :type rate_limit: float or RateLimiter
+
+    :param half_life: Seconds after which a read counts half when
+        ranking entries to refresh (default == 30)
+    :type half_life: float
+
+    :param lead: Part of max_age left when an entry is refreshed, so
+        that it is replaced before getting stale (default == 0.2)
+    :type lead: float
+
+    :param clock: Monotonic clock in seconds (default == time.monotonic)
+    :type clock: callable
+    """
+    def __init__(self, client, rate_limit=None, half_life=30, lead=0.2,
+                 clock=monotonic):
+        if rate_limit is not None and not hasattr(rate_limit, 'acquire'):
+            from .ratelimit import RateLimiter
+            rate_limit = RateLimiter(rate_limit)
+        self.client = client
+        self.rate_limit = rate_limit
+        self.half_life = half_life
+        self.lead = lead
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._entries = {}
+        self._lock = Lock()
+        self._wakeup = Event()
+        self._stopped = Event()
+        self._thread = None
+        client.prefetch = self
+
+    """ ###########################################
+        ############  SUBSCRIPTIONS  ##############
+        ###########################################
+    """
+    def subscribe(self, group, command, args=None, max_age=1.0, ttl=60,
+                  parse_float=None):
+        """
+        Registers interest in a command response. Subscribing again
+        keeps the strictest max_age and the longest ttl.
+
+        :param group: Group of the command (ex: 'market')
+        :type group: str
+
+        :param command: Read only command (ex: 'getmarketorderbook')
+        :type command: str
+
+        :param args: Arguments exactly as passed by the Bittrex method
+            (ex: {'marketname': 'BTC-ETH'}) (default == None)
+        :type args: dict
+
+        :param max_age: Seconds a response is served for (default == 1.0)
+        :type max_age: float
+
+        :param ttl: Seconds without reads after which the subscription
+            is dropped (default == 60)
+        :type ttl: float
+
+        :param parse_float: parse_float the response is read with, ex:
+            float for compact order books (default == None, client's)
+        """
+        if command not in READ_ONLY_COMMANDS:
+            raise BittrexError("Command can't be prefetched: %s" % command)
+        key = _key(group, command, args, parse_float)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = _Entry(group, command, args, parse_float,
+                                            max_age, ttl, now)
+            else:
+                entry.max_age = min(entry.max_age, max_age)
+                entry.ttl = max(entry.ttl, ttl)
+                entry.accessed = now
+        self._wakeup.set()
+
+    def unsubscribe(self, group, command, args=None, parse_float=None):
+        with self._lock:
+            self._entries.pop(_key(group, command, args, parse_float), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, group, command, args=None, parse_float=None):
+        """
+        Returns a response for a command, cached while fresh.
+        Called by Bittrex.__call__() for attached clients.
+
+        :rtype : dict
+        """
+        now = self.clock()
+        cached = None
+        with self._lock:
+            entry = self._entries.get(_key(group, command, args, parse_float))
+            if entry is not None:
+                entry.score = self._score(entry, now) + 1
+                entry.accessed = now
+                if entry.fetched is not None and \
+                        now - entry.fetched < entry.max_age:
+                    self.hits += 1
+                    cached = entry.response
+                else:
+                    self.misses += 1
+        if cached is not None:
+            # Callers may modify responses, the cache keeps its own
+            return deepcopy(cached)
+
+        ret = self.client._fetch(group, command, args, parse_float)
+        if entry is not None and ret.get('success'):
+            self._store(entry, ret, now)
+        return ret
+
+    """ ###########################################
+        ##############  SCHEDULING  ###############
+        ###########################################
+    """
+    def _score(self, entry, now):
+        # Reads decay with age, so recent interest ranks first
+        return entry.score * 0.5 ** ((now - entry.accessed) / self.half_life)
+
+    def _store(self, entry, ret, fetched):
+        with self._lock:
+            if entry.fetched is None or fetched > entry.fetched:
+                entry.response = deepcopy(ret)
+                entry.fetched = fetched
+                entry.error = None
+
+    def _next(self, now):
+        """
+        Drops expired entries and returns (entry, None) for the most
+        read entry due for refresh or (None, seconds until one is due).
+        """
+        best, wait = None, None
+        for key, entry in list(self._entries.items()):
+            if now - entry.accessed > entry.ttl:
+                del self._entries[key]
+                continue
+            due = entry.retry_at
+            if entry.fetched is not None:
+                due = max(due, entry.fetched +
+                               entry.max_age * (1 - self.lead))
+            if due > now:
+                wait = due - now if wait is None else min(wait, due - now)
+            elif best is None or \
+                    self._score(entry, now) > self._score(best, now):
+                best = entry
+        return (best, None) if best is not None else (None, wait)
+
+    def refresh_once(self):
+        """
+        Refreshes the most read entry due for refresh, if the
+        prefetch budget allows it.
+
+        :return: Seconds until a refresh is due, 0 if one may be due
+            now, None without subscriptions
+        :rtype : float
+        """
+        now = self.clock()
+        with self._lock:
+            entry, wait = self._next(now)
+        if entry is None:
+            return wait
+        if self.rate_limit is not None and not self.rate_limit.try_acquire():
+            return 1 / self.rate_limit.rate
+
+        try:
+            ret = self.client._fetch(entry.group, entry.command,
+                                     entry.args, entry.parse_float)
+            if not ret.get('success'):
+                raise BittrexError(ret.get('message'))
+        except Exception as err:
+            # Kept for inspection, retried once max_age has passed
+            with self._lock:
+                entry.error = err
+                entry.retry_at = now + entry.max_age
+        else:
+            self._store(entry, ret, now)
+        self.refreshes += 1
+        return 0
+
+    def _run(self):
+        while not self._stopped.is_set():
+            wait = self.refresh_once()
+            if wait != 0:
+                self._wakeup.wait(wait)
+                self._wakeup.clear()
+
+    def start(self):
+        """Starts refreshing in a background thread."""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = Thread(target=self._run, daemon=True,
+                                  name='bittrex-prefetch')
+            self._thread.start()
+
+    def stop(self):
+        """Stops the background thread, cached responses are kept."""
+        if self._thread is not None:
+            self._stopped.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """Stops refreshing and detaches from the client."""
+        self.stop()
+        if self.client.prefetch is self:
+            self.client.prefetch = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
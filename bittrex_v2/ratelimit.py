@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+from time import sleep, monotonic
+
+
+class RateLimiter(object):
+    """
+    Thread safe token bucket used to keep a client
+    under a given request rate.
+
+    :param rate: Allowed requests per second
+    :type rate: float
+
+    :param burst: Requests that can be sent at once after
+        being idle (default == max(1, rate))
+    :type burst: float
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self._tokens = self.burst
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """
+        Takes a token if one is available without waiting.
+
+        :rtype : bool
+        """
+        with self._lock:
+            self._refill(monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout=None):
+        """
+        Takes a token, waiting until one is available.
+
+        :param timeout: Maximum seconds to wait (default == None)
+        :type timeout: float
+
+        :return: False if no token could be taken within timeout
+        :rtype : bool
+        """
+        end = None if timeout is None else monotonic() + timeout
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if end is not None and now + wait > end:
+                return False
+            sleep(wait)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Incremental parsing of Bittrex json envelopes:
+
+    {"success": true, "message": "", "result": [ {...}, {...}, ... ]}
+
+iter_result() consumes response body chunks as they arrive and
+yields the items of 'result' one by one, so the first records are
+available before the body is complete and only a small window of
+the body is kept in memory.
+"""
+
+from codecs import getincrementaldecoder
+from json import JSONDecoder
+
+from .bittrex import BittrexError
+
+
+_WHITESPACE = ' \t\n\r'
+# Consumed text is dropped from the buffer once it grows past this
+_COMPACT_AT = 1 << 16
+
+
+class _Buffer(object):
+    """Decoded text window over a stream of byte chunks."""
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Appends the next chunk, returns False at end of stream."""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                if self.pos > _COMPACT_AT:
+                    self.text, self.pos = self.text[self.pos:], 0
+                self.text += text
+                return True
+        self.text += self._decoder.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Next non whitespace character or '' at end of stream."""
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars or not char:
+            raise BittrexError("Invalid json body near: %r"
+                               % self.text[self.pos:self.pos + 40])
+        self.pos += 1
+        return char
+
+    def value(self, decoder):
+        """Decodes the next complete json value."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                # Grow the window geometrically, so that a value spanning
+                # many chunks is not parsed again for every chunk
+                target = len(self.text) + len(self.text) - self.pos
+                if not self.fill():
+                    raise BittrexError("Truncated json body")
+                while len(self.text) < target and self.fill():
+                    pass
+                continue
+            # A number ending the window may continue in the next chunk
+            if end == len(self.text) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_result(chunks, parse_float=None, parse_int=None, key='result'):
+    """
+    Yields the items of the <key> list of a json object read from
+    byte chunks. If the value is not a list it is yielded once,
+    null yields nothing.
+    Raises 'BittrexError' when 'success' is false.
+
+    :param chunks: Iterable of bytes
+    :type chunks: iterable
+
+    :param parse_float: parser for json floats (default == float)
+    :param parse_int: parser for json ints (default == int)
+
+    :param key: Key holding the records (default == 'result')
+    :type key: str
+    """
+    decoder = JSONDecoder(parse_float=parse_float, parse_int=parse_int)
+    buf = _Buffer(chunks)
+    envelope = {}
+
+    buf.expect('{')
+    if buf.peek() == '}':
+        return
+    while True:
+        name = buf.value(decoder)
+        buf.expect(':')
+        if name == key and buf.peek() == '[':
+            if envelope.get('success') is False:
+                raise BittrexError(envelope.get('message'))
+            buf.pos += 1
+            if buf.peek() == ']':
+                buf.pos += 1
+            else:
+                while True:
+                    yield buf.value(decoder)
+                    if buf.expect(',]') == ']':
+                        break
+        else:
+            envelope[name] = buf.value(decoder)
+            if name == key:
+                if envelope.get('success') is False:
+                    raise BittrexError(envelope.get('message'))
+                if envelope[name] is not None:
+                    yield envelope[name]
+        if buf.expect(',}') == '}':
+            break
+
+    if envelope.get('success') is False:
+        raise BittrexError(envelope.get('message'))
@@ -2,9 +2,31 @@
 # -*- coding: utf-8 -*-
 
 import unittest
-from bittrex_v2 import Bittrex, BittrexError
+from bittrex_v2 import (Bittrex, BittrexError, TickArchive, TickSeries,
+                        BittrexPool, OrderBook, book_metrics,
+                        MarketDataPublisher, MarketDataReader,
+                        ArbitrageGraph, MetadataIndex)
+from bittrex_v2.cli import export_ticks, export_history
+from bittrex_v2.deadline import Deadline, DeadlineExceeded
+from bittrex_v2.paper import PaperExchange
+from bittrex_v2.streaming import iter_result
+from bittrex_v2.prefetch import PrefetchScheduler
+from bittrex_v2.transport import (Response, RecordingTransport,
+                                  ReplayTransport)
 from decimal import Decimal
 from datetime import datetime
+from urllib.parse import urlsplit, parse_qsl
+import os
+import sys
+import subprocess
+import tempfile
+import uuid
+import struct
+from time import sleep, perf_counter
+import gzip
+import threading
+from http.server import (BaseHTTPRequestHandler, HTTPServer,
+                         ThreadingHTTPServer)
 
 
 """ ###########################################
@@ -130,6 +152,17 @@ class TestPublicBittrex(unittest.TestCase):
 
             self.assertIs(type(actual['result'][0]['IsVerified']), bool)
 
+    def test_get_markets(self):
+        actual = self.bittrex.get_markets()
+        test_result(self, actual)
+
+        self.assertEqual(len(actual['result']) > 0, True)
+        for market in actual['result']:
+            self.assertIs(type(market['MarketName']), str)
+            self.assertIs(type(market['BaseCurrency']), str)
+            self.assertIs(type(market['MarketCurrency']), str)
+            self.assertIs(type(market['IsActive']), bool)
+
     def test_get_currencies(self):
         actual = self.bittrex.get_currencies()
         test_result(self, actual)
@@ -480,5 +513,756 @@ class TestPrivateBittrex(unittest.TestCase):
         actual = self.bittrex.generate_deposit_address(config.COIN)
         self.assertEqual(actual['message'], 'ADDRESS_GENERATING')
 
+class TestTickArchive(unittest.TestCase):
+    """
+    Offline tests for the binary tick archive.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = TickArchive(self.tmp.name)
+        self.ticks = [{'O': Decimal('0.1'), 'H': Decimal('0.2'),
+                       'L': Decimal('0.05'), 'C': Decimal(i),
+                       'V': Decimal('10'), 'BV': Decimal('1'),
+                       'T': '2017-10-01T00:%02d:00' % i} for i in range(10)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_read(self):
+        written = self.archive.append(config.PAIR, 'oneMin',
+                                      {'success': True, 'message': '',
+                                       'result': self.ticks})
+        self.assertEqual(written, 10)
+        # Overlapping downloads only append newer ticks
+        self.assertEqual(self.archive.append(config.PAIR, 'oneMin',
+                                             self.ticks[5:]), 0)
+
+        with self.archive.open(config.PAIR, 'oneMin') as series:
+            self.assertEqual(len(series), 10)
+            self.assertEqual(list(series.column('C')),
+                             [float(i) for i in range(10)])
+            self.assertEqual(series.record(-1)[0],
+                             series.timestamps[0] + 9 * 60)
+
+            window = series.between('2017-10-01T00:03:00',
+                                    '2017-10-01T00:06:00')
+            self.assertEqual(len(window), 4)
+            self.assertEqual(list(window.column('C')), [3.0, 4.0, 5.0, 6.0])
+
+    def test_interrupted_append(self):
+        self.archive.append(config.PAIR, 'oneMin', self.ticks[:5])
+        with open(self.archive.path(config.PAIR, 'oneMin'), 'ab') as f:
+            f.write(b'\x01' * 10)
+        self.assertEqual(self.archive.append(config.PAIR, 'oneMin',
+                                             self.ticks), 5)
+        with self.archive.open(config.PAIR, 'oneMin') as series:
+            self.assertEqual(list(series.column('C')),
+                             [float(i) for i in range(10)])
+
+    def test_invalid_file(self):
+        path = os.path.join(self.tmp.name, 'invalid.ticks')
+        with open(path, 'wb') as f:
+            f.write(b'not a tick file!')
+        with self.assertRaises(BittrexError):
+            TickSeries(path)
+
+class StubTransport(object):
+    """
+    Transport returning canned bodies, used by offline tests.
+    """
+    def __init__(self, body=b'{"success":true,"message":"","result":[]}'):
+        self.body = body
+        self.calls = []
+
+    def __call__(self, url, headers, timeout):
+        self.calls.append((url, headers, timeout))
+        body = self.body(url) if callable(self.body) else self.body
+        return Response(200, body)
+
+class TestTransport(unittest.TestCase):
+    """
+    Offline tests for recording and replay transports.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tmp.name, 'session.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_record_and_replay(self):
+        stub = StubTransport(b'{"success":true,"message":"","result":1.5}')
+        recorder = RecordingTransport(self.log, transport=stub)
+        bittrex = Bittrex('key', 'secret', transport=recorder)
+        expected = bittrex.get_balance(config.COIN)
+        recorder.close()
+
+        with open(self.log) as f:
+            log = f.read()
+        self.assertNotIn('apikey=key', log)
+        self.assertNotIn('apisign', log)
+        self.assertIn('REDACTED', log)
+
+        bittrex = Bittrex('other', 'secret',
+                          transport=ReplayTransport(self.log))
+        self.assertEqual(bittrex.get_balance(config.COIN), expected)
+        with self.assertRaises(BittrexError):
+            bittrex.get_balance(config.COIN)
+
+class TestPreparedCommand(unittest.TestCase):
+    """
+    Offline tests for prepared commands.
+    """
+    def setUp(self):
+        self.stub = StubTransport()
+        self.bittrex = Bittrex('key', 'secret', transport=self.stub)
+
+    def test_same_request_as_call(self):
+        args = {'orderid': 'uuid'}
+        self.bittrex.__call__('orders', 'getorder', args)
+        self.bittrex.prepare('orders', 'getorder')(args)
+        (url, headers, _), (prepared_url, prepared_headers, _) = self.stub.calls
+
+        strip = lambda u: '&'.join(p for p in u.split('&')
+                                   if not p.startswith('nonce='))
+        self.assertEqual(strip(url), strip(prepared_url))
+        self.assertIn('apisign', prepared_headers)
+        self.assertEqual(args, {'orderid': 'uuid'})
+
+        self.bittrex.get_market_summaries()
+        self.bittrex.prepare('markets', 'getmarketsummaries')()
+        self.assertEqual(self.stub.calls[-2][0], self.stub.calls[-1][0])
+
+    def test_key_needed(self):
+        with self.assertRaises(BittrexError):
+            Bittrex(transport=self.stub).prepare('orders', 'getorder')
+
+class TestBittrexPool(unittest.TestCase):
+    """
+    Offline tests for multi-account pools.
+    """
+    def test_fan_out(self):
+        stub = StubTransport()
+        accounts = {'acc%d' % i: ('key%d' % i, 'secret') for i in range(5)}
+        with BittrexPool(accounts, transport=stub, rate_limit=100) as pool:
+            results = pool.get_balance(config.COIN)
+            self.assertEqual(sorted(results), sorted(accounts))
+            self.assertEqual(len(stub.calls), 5)
+            self.assertEqual(sorted(pool.fan_out('get_order_history',
+                                                 accounts=['acc1'])),
+                             ['acc1'])
+            with self.assertRaises(BittrexError):
+                pool.fan_out('_request')
+
+    def test_fan_out_deadline(self):
+        def slow(url, headers, timeout):
+            sleep(0.3)
+            return Response(200, b'{"success":true,"message":"","result":1}')
+
+        with BittrexPool({'acc': ('key', 'secret')}, transport=slow) as pool:
+            with Deadline(0.1):
+                with self.assertRaises(DeadlineExceeded):
+                    pool.get_balance(config.COIN)
+
+    def test_shared_transport_options(self):
+        with BittrexPool({'acc': ('key', 'secret')},
+                         max_body_size=1024) as pool:
+            self.assertEqual(pool.transport.max_body_size, 1024)
+            self.assertIs(pool.transport.session, pool.session)
+
+    def test_nonce_increases(self):
+        bittrex = Bittrex('key', 'secret')
+        nonces = [bittrex.nonce for _ in range(100)]
+        self.assertEqual(nonces, sorted(set(nonces)))
+
+class TestOrderBook(unittest.TestCase):
+    """
+    Offline tests for compact order books.
+    """
+    body = (b'{"success":true,"message":"","result":{'
+            b'"buy":[{"Quantity":2.0,"Rate":0.9},{"Quantity":1.0,"Rate":1.0}],'
+            b'"sell":[{"Quantity":1.0,"Rate":1.1},{"Quantity":5.0,"Rate":1.5}]}}')
+
+    def setUp(self):
+        self.bittrex = Bittrex(transport=StubTransport(self.body))
+
+    def test_compact(self):
+        book = self.bittrex.get_market_orderbook(config.PAIR,
+                                                 compact=True)['result']
+        self.assertIsInstance(book, OrderBook)
+        self.assertEqual(list(book.bid_rates), [1.0, 0.9])
+        self.assertEqual(list(book.ask_quantities), [1.0, 5.0])
+        self.assertAlmostEqual(book.spread, 0.1)
+
+        plain = self.bittrex.get_market_orderbook(config.PAIR)
+        self.assertIs(type(plain['result']['buy'][0]['Rate']), Decimal)
+
+    def test_metrics(self):
+        book = self.bittrex.get_market_orderbook(config.PAIR,
+                                                 compact=True)['result']
+        metrics = book_metrics([book], depth_pct=15, notional=1.1)
+        self.assertAlmostEqual(metrics[config.PAIR]['bid_depth'], 2.8)
+        self.assertAlmostEqual(metrics[config.PAIR]['ask_depth'], 1.1)
+        self.assertAlmostEqual(metrics[config.PAIR]['buy_slippage'], 0.0)
+        self.assertIsNone(book.slippage('sell', 100))
+
+class TestMarketDataBus(unittest.TestCase):
+    """
+    Offline tests for the shared memory market data bus.
+    """
+    summaries = (b'{"success":true,"message":"","result":[{"Market":{},'
+                 b'"Summary":{"MarketName":"BTC-ETH","Bid":0.05,'
+                 b'"Ask":0.051,"Last":0.0505}}]}')
+
+    def body(self, url):
+        if 'getmarketorderbook' in url:
+            return TestOrderBook.body
+        return self.summaries
+
+    def test_publish_and_read(self):
+        client = Bittrex(transport=StubTransport(self.body))
+        name = 'bittrex_v2_test_%s' % uuid.uuid4().hex[:8]
+        with MarketDataPublisher(client, name=name, size=1 << 16,
+                                 markets=[config.PAIR]) as publisher:
+            with MarketDataReader(name) as reader:
+                self.assertIsNone(reader.read())
+
+                publisher.publish(publisher.poll())
+                snapshot = reader.read()
+                self.assertIs(reader.read(), snapshot)
+                self.assertEqual(reader.ticker(config.PAIR)['Bid'],
+                                 Decimal('0.05'))
+                self.assertEqual(list(reader.orderbook(config.PAIR).ask_rates),
+                                 [1.1, 1.5])
+
+                version = reader.version
+                publisher.publish({'tickers': {}, 'orderbooks': {}})
+                self.assertEqual(reader.version, version + 2)
+                self.assertIsNone(reader.ticker(config.PAIR))
+
+            with self.assertRaises(BittrexError):
+                publisher.publish(b'x' * (1 << 16))
+
+    def test_interrupted_write(self):
+        name = 'bittrex_v2_test_%s' % uuid.uuid4().hex[:8]
+        client = Bittrex(transport=StubTransport(self.body))
+        with MarketDataPublisher(client, name=name, size=1 << 16) as publisher:
+            # Publisher died with a write in progress (odd sequence)
+            struct.pack_into('<Q', publisher.shm.buf, 8, 3)
+            with MarketDataReader(name, timeout=0.05) as reader:
+                with self.assertRaises(BittrexError):
+                    reader.read()
+
+class TestArbitrageGraph(unittest.TestCase):
+    """
+    Offline tests for the triangular arbitrage engine.
+    """
+    def summary(self, market, bid, ask):
+        return {'Market': {}, 'Summary': {'MarketName': market,
+                                          'Bid': Decimal(bid),
+                                          'Ask': Decimal(ask)}}
+
+    def test_cycles(self):
+        graph = ArbitrageGraph(['BTC-ETH', 'BTC-LTC', 'ETH-LTC', 'BTC-XRP'])
+        self.assertEqual(len(graph.cycles), 2)
+
+        found = graph.update([self.summary('BTC-ETH', '0.049', '0.05'),
+                              self.summary('BTC-LTC', '0.011', '0.0111'),
+                              self.summary('ETH-LTC', '0.19', '0.2')])
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0].path, ('BTC', 'ETH', 'LTC', 'BTC'))
+        self.assertAlmostEqual(found[0].profit, 1.1 * 0.9975 ** 3 - 1)
+
+        self.assertEqual(graph.update([self.summary('BTC-XRP', '1', '2')]), [])
+        self.assertEqual(graph.update([self.summary('BTC-LTC', '0.01',
+                                                    '0.0111')]), [])
+        self.assertEqual(graph.opportunities(), [])
+
+class TestMetadataIndex(unittest.TestCase):
+    """
+    Offline tests for the metadata index and local validation.
+    """
+    bodies = {
+        'getmarkets': b'[{"MarketName":"BTC-ETH","BaseCurrency":"BTC",'
+                      b'"MarketCurrency":"ETH","IsActive":true},'
+                      b'{"MarketName":"BTC-XRP","BaseCurrency":"BTC",'
+                      b'"MarketCurrency":"XRP","IsActive":true}]',
+        'getcurrencies': b'[{"Currency":"BTC","IsActive":true},'
+                         b'{"Currency":"ETH","IsActive":true},'
+                         b'{"Currency":"XRP","IsActive":true}]',
+        'getwallethealth': b'[{"Health":{"Currency":"XRP","IsActive":false}}]',
+        }
+
+    def body(self, url):
+        for command, result in self.bodies.items():
+            if '/%s?' % command in url:
+                return b'{"success":true,"message":"","result":%s}' % result
+        return b'{"success":true,"message":"","result":null}'
+
+    def setUp(self):
+        self.stub = StubTransport(self.body)
+        self.bittrex = Bittrex('key', 'secret', transport=self.stub)
+        self.index = MetadataIndex(self.bittrex)
+        self.bittrex.metadata = self.index
+
+    def test_lookups(self):
+        self.index.check_market('BTC-XYZ')    # not loaded, no checks
+        self.index.refresh()
+        self.assertEqual(self.index.markets_by_base('BTC'),
+                         ['BTC-ETH', 'BTC-XRP'])
+        self.assertEqual(self.index.markets_by_quote('ETH'), ['BTC-ETH'])
+        self.assertFalse(self.index.wallet_online('XRP'))
+        self.assertEqual(self.index.online_markets(), ['BTC-ETH'])
+
+    def test_local_validation(self):
+        self.index.refresh()
+        calls = len(self.stub.calls)
+        with self.assertRaises(BittrexError):
+            self.bittrex.get_market_summary('BTC-XYZ')
+        with self.assertRaises(BittrexError):
+            self.bittrex.get_balance('XYZ')
+        with self.assertRaises(BittrexError):
+            self.bittrex.place_order('buy', 'BTC-XRP', 1, 1, 'LIMIT', 'GOOD_TIL_CANCELLED')
+        self.assertEqual(len(self.stub.calls), calls)
+
+        self.bittrex.get_ticks('BTC-XRP', 'hour')
+        self.bittrex.get_balance('XRP')
+        self.assertEqual(len(self.stub.calls), calls + 2)
+
+class TestColdStart(unittest.TestCase):
+    """
+    The HTTP stack and optional components must not be
+    imported until they are used.
+    """
+    def test_lazy_imports(self):
+        code = ('import sys, bittrex_v2; bittrex_v2.Bittrex(); '
+                'print(sorted(m for m in ("requests", "bittrex_v2.bus", '
+                '"bittrex_v2.pool") if m in sys.modules)); '
+                'bittrex_v2.BittrexPool; print("bittrex_v2.pool" in sys.modules)')
+        out = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(out.decode().split(), ['[]', 'True'])
+
+class TestExportCLI(unittest.TestCase):
+    """
+    Offline tests for tick exports and checkpoints.
+    """
+    body = (b'{"success":true,"message":"","result":['
+            b'{"O":1,"H":2,"L":0.5,"C":1.5,"V":10,"T":"2017-10-01T00:00:00",'
+            b'"BV":15},'
+            b'{"O":1.5,"H":2,"L":1,"C":2,"V":5,"T":"2017-10-01T00:01:00",'
+            b'"BV":10}]}')
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.stub = StubTransport(self.body)
+        self.bittrex = Bittrex(transport=self.stub)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_export_and_resume(self):
+        checkpoint = os.path.join(self.tmp.name, 'checkpoint')
+        rows = export_ticks(self.bittrex, ['BTC-ETH', 'BTC-LTC'], 'oneMin',
+                            self.tmp.name, 'csv', checkpoint, batch_size=1)
+        self.assertEqual(rows, 4)
+        with open(os.path.join(self.tmp.name, 'BTC-ETH_oneMin.csv')) as f:
+            self.assertEqual(f.readline().strip(), 'O,H,L,C,V,T,BV')
+            self.assertEqual(len(f.readlines()), 2)
+
+        rows = export_ticks(self.bittrex, ['BTC-ETH', 'BTC-LTC', 'BTC-XRP'],
+                            'oneMin', self.tmp.name, 'jsonl', checkpoint)
+        self.assertEqual(rows, 2)
+        self.assertEqual(len(self.stub.calls), 3)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name,
+                                                    'BTC-XRP_oneMin.jsonl')))
+
+class TestDeadline(unittest.TestCase):
+    """
+    Offline tests for per command timeouts, deadlines and retries.
+    """
+    def test_command_timeouts(self):
+        stub = StubTransport()
+        bittrex = Bittrex('key', 'secret', transport=stub,
+                          command_timeouts={'getorder': 1})
+        bittrex.get_ticks(config.PAIR, 'day')
+        bittrex.cancel('uuid')
+        bittrex.get_order('uuid')
+        bittrex.get_currencies()
+        self.assertEqual([c[2] for c in stub.calls], [30, 2, 1, 5])
+
+        # An explicit timeout applies to commands with defaults too
+        explicit = Bittrex(timeout=1, command_timeouts={'GetTicks': 3})
+        self.assertEqual(explicit._timeout('getmarketsummaries', None), 1)
+        self.assertEqual(explicit._timeout('tradecancel', None), 1)
+        self.assertEqual(explicit._timeout('GetTicks', None), 3)
+
+        with Deadline(1.5):
+            bittrex.get_ticks(config.PAIR, 'day')
+        connect, read = stub.calls[-1][2]
+        self.assertLessEqual(connect + read, 1.5)
+        self.assertGreater(read, 0)
+
+    def test_deadline_exceeded(self):
+        bittrex = Bittrex(transport=StubTransport())
+        with Deadline(0):
+            with self.assertRaises(DeadlineExceeded):
+                bittrex.get_currencies()
+        with Deadline(10):
+            with Deadline(0.5) as inner:
+                self.assertLessEqual(inner.remaining(), 0.5)
+
+    def test_retries(self):
+        attempts = []
+        def flaky(url, headers, timeout):
+            attempts.append(url)
+            if len(attempts) < 3:
+                raise ConnectionError('reset')
+            return Response(200, b'{"success":true,"message":"","result":1}')
+
+        bittrex = Bittrex('key', 'secret', transport=flaky, retries=2)
+        self.assertEqual(bittrex.get_currencies()['result'], 1)
+        self.assertEqual(len(attempts), 3)
+
+        # Every attempt of a private command is signed with a new nonce
+        for call in (lambda: bittrex.get_order('uuid'),
+                     lambda: bittrex.prepare('orders', 'getorder')(
+                         {'orderid': 'uuid'})):
+            del attempts[:]
+            self.assertEqual(call()['result'], 1)
+            nonces = [dict(parse_qsl(urlsplit(url).query))['nonce']
+                      for url in attempts]
+            self.assertEqual(len(set(nonces)), 3)
+
+        del attempts[:]
+        with self.assertRaises(ConnectionError):
+            bittrex.place_order('buy', config.PAIR, 1, 1, 'LIMIT',
+                                'GOOD_TIL_CANCELLED')
+        self.assertEqual(len(attempts), 1)
+
+        del attempts[:]
+        with Deadline(0.15):
+            with self.assertRaises(DeadlineExceeded):
+                bittrex.get_currencies()
+
+class TestPaperExchange(unittest.TestCase):
+    """
+    Offline tests for the paper trading backend.
+    """
+    book = {'buy': [{'Quantity': Decimal('2'), 'Rate': Decimal('0.04')}],
+            'sell': [{'Quantity': Decimal('1'), 'Rate': Decimal('0.05')},
+                     {'Quantity': Decimal('5'), 'Rate': Decimal('0.06')}]}
+
+    def setUp(self):
+        self.paper = PaperExchange(balances={'BTC': 1}, fee=0)
+        self.paper.load_orderbook(config.PAIR, self.book)
+        self.bittrex = Bittrex('paper', 'paper', transport=self.paper)
+
+    def buy(self, quantity, rate, time_in_effect='GOOD_TIL_CANCELLED'):
+        return self.bittrex.place_order('buy', config.PAIR, quantity, rate,
+                                        'LIMIT', time_in_effect)
+
+    def test_fills_and_balances(self):
+        uuid = self.buy(2, '0.055')['result']['OrderId']
+        order = self.bittrex.get_order(uuid)['result']
+        self.assertEqual(order['QuantityRemaining'], 1)
+        self.assertTrue(order['IsOpen'])
+        self.assertEqual(self.bittrex.get_balance('ETH')['result']['Balance'], 1)
+        btc = self.bittrex.get_balance('BTC')['result']
+        self.assertEqual(btc['Balance'], Decimal('0.95'))
+        self.assertEqual(btc['Available'], Decimal('0.895'))
+
+        # New snapshot crosses the resting order
+        self.paper.load_orderbook(config.PAIR, {
+            'buy': [], 'sell': [{'Quantity': 3, 'Rate': '0.052'}]})
+        self.assertFalse(self.bittrex.get_order(uuid)['result']['IsOpen'])
+        self.assertEqual(self.bittrex.get_open_orders()['result'], [])
+        self.assertEqual(len(self.bittrex.get_order_history()['result']), 1)
+        btc = self.bittrex.get_balance('BTC')['result']
+        self.assertEqual(btc['Balance'], btc['Available'])
+
+    def test_cancel_and_time_in_effect(self):
+        uuid = self.buy(1, '0.01')['result']['OrderId']
+        self.assertEqual(len(self.bittrex.get_open_orders(config.PAIR)['result']), 1)
+        self.assertTrue(self.bittrex.cancel(uuid)['success'])
+        self.assertEqual(self.bittrex.cancel(uuid)['message'], 'INVALID_ORDER')
+        self.assertEqual(self.bittrex.get_balance('BTC')['result']['Available'], 1)
+
+        self.assertFalse(self.buy(10, '0.06', 'FILL_OR_KILL')['success'])
+        uuid = self.buy(10, '0.06', 'IMMEDIATE_OR_CANCEL')['result']['OrderId']
+        order = self.bittrex.get_order(uuid)['result']
+        self.assertFalse(order['IsOpen'])
+        self.assertEqual(order['QuantityRemaining'], 4)
+        self.assertEqual(self.buy(100, '1')['message'], 'INSUFFICIENT_FUNDS')
+
+    def test_replies_match_state(self):
+        paper = PaperExchange(balances={'BTC': 1})
+        paper.load_orderbook(config.PAIR, {
+            'buy': [], 'sell': [{'Quantity': '0.3', 'Rate': '0.0512345'},
+                                {'Quantity': 5, 'Rate': '0.0612347'}]})
+        bittrex = Bittrex('paper', 'paper', transport=paper)
+        uuid = bittrex.place_order('buy', config.PAIR, '0.71234567',
+                                   '0.0612347', 'LIMIT',
+                                   'GOOD_TIL_CANCELLED')['result']['OrderId']
+        order = bittrex.get_order(uuid)['result']
+        self.assertEqual(order['PricePerUnit'],
+                         paper.orders[uuid]['PricePerUnit'])
+        self.assertEqual(bittrex.get_balance('BTC')['result']['Balance'],
+                         paper.balances['BTC'])
+        self.assertEqual(paper.reserved['BTC'], 0)
+
+class TestPrefetchScheduler(unittest.TestCase):
+    """
+    Offline tests for background refreshing of subscribed commands.
+    """
+    def setUp(self):
+        self.now = 0.0
+        self.stub = StubTransport()
+        self.bittrex = Bittrex(transport=self.stub)
+        self.prefetch = PrefetchScheduler(self.bittrex,
+                                          clock=lambda: self.now)
+
+    def test_cached_reads(self):
+        self.prefetch.subscribe('market', 'getmarketorderbook',
+                                {'marketname': config.PAIR}, max_age=1)
+        self.assertEqual(self.prefetch.refresh_once(), 0)
+        self.assertEqual(len(self.stub.calls), 1)
+
+        # Fresh reads are served without requests
+        self.now = 0.5
+        self.bittrex.get_market_orderbook(config.PAIR)
+        self.assertEqual(len(self.stub.calls), 1)
+        self.assertAlmostEqual(self.prefetch.refresh_once(), 0.3)
+
+        # Stale reads are sent and their responses cached
+        self.now = 1.5
+        self.bittrex.get_market_orderbook(config.PAIR)
+        self.bittrex.get_market_orderbook(config.PAIR)
+        self.assertEqual(len(self.stub.calls), 2)
+        self.assertEqual((self.prefetch.hits, self.prefetch.misses), (2, 1))
+        self.bittrex.get_ticks(config.PAIR, 'day')
+        self.assertEqual(len(self.stub.calls), 3)
+
+        with self.assertRaises(BittrexError):
+            self.prefetch.subscribe('market', 'tradecancel')
+
+    def test_cached_copies(self):
+        self.stub.body = b'{"success":true,"message":"","result":[1,2]}'
+        self.prefetch.subscribe('markets', 'getmarketsummaries')
+        self.bittrex.get_market_summaries()['result'].clear()
+        self.bittrex.get_market_summaries()['result'].append(3)
+        self.assertEqual(self.bittrex.get_market_summaries()['result'],
+                         [1, 2])
+        self.assertEqual(len(self.stub.calls), 1)
+
+    def test_priority_and_expiry(self):
+        for market in ('BTC-ETH', 'BTC-LTC'):
+            self.prefetch.subscribe('market', 'getmarketsummary',
+                                    {'marketname': market}, ttl=10)
+        for _ in range(3):
+            self.bittrex.get_market_summary('BTC-LTC')
+        self.now = 2
+        self.prefetch.refresh_once()
+        self.assertIn('BTC-LTC', self.stub.calls[-1][0])
+
+        self.now = 11
+        self.bittrex.get_market_summary('BTC-LTC')
+        self.now = 12
+        self.prefetch.refresh_once()
+        self.assertEqual(len(self.prefetch), 1)
+
+    def test_background_thread(self):
+        bittrex = Bittrex(transport=self.stub)
+        with PrefetchScheduler(bittrex, rate_limit=100) as prefetch:
+            prefetch.subscribe('currencies', 'getcurrencies', max_age=0.05)
+            sleep(0.3)
+            self.assertGreater(len(self.stub.calls), 2)
+            bittrex.get_currencies()
+            self.assertEqual(prefetch.hits, 1)
+        self.assertIsNone(bittrex.prefetch)
+
+class GzipHandler(BaseHTTPRequestHandler):
+    body = json.dumps({'success': True, 'message': '',
+                       'result': [{'O': 1.5, 'T': '2017-10-01T00:%02d:00' % i}
+                                  for i in range(60)]}).encode()
+
+    def do_GET(self):
+        body = self.body
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class DripHandler(BaseHTTPRequestHandler):
+    body = b'{"success":true,"message":"","result":[1,2,3,4,5,6,7,8,9]}'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        try:
+            for i in range(0, len(self.body), 4):
+                self.wfile.write(self.body[i:i + 4])
+                self.wfile.flush()
+                sleep(0.05)
+        except ConnectionError:
+            # Client gave up on the deadline
+            pass
+
+    def log_message(self, *args):
+        pass
+
+class TestStreaming(unittest.TestCase):
+    """
+    Offline tests for compressed, incremental response handling
+    against a local HTTP server.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), GzipHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.local = 'http://127.0.0.1:%d' % cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def client(self, **kwargs):
+        from bittrex_v2.transport import RequestsTransport
+        inner = RequestsTransport(chunk_size=64,
+                                  max_body_size=kwargs.get('max_body_size'))
+        local = lambda url: url.replace('https://bittrex.com', self.local)
+
+        class LocalTransport(object):
+            def __call__(self, url, headers, timeout):
+                return inner(local(url), headers, timeout)
+
+            def stream(self, url, headers, timeout):
+                return inner.stream(local(url), headers, timeout)
+
+        return Bittrex(transport=LocalTransport(), **kwargs)
+
+    def test_stream(self):
+        expected = json.loads(GzipHandler.body, parse_float=Decimal)['result']
+        bittrex = self.client()
+        self.assertEqual(bittrex.get_ticks(config.PAIR, 'oneMin')['result'],
+                         expected)
+        ticks = bittrex.stream('market', 'GetTicks',
+                               {'marketName': config.PAIR,
+                                'tickInterval': 'oneMin'})
+        self.assertEqual(next(ticks), expected[0])
+        self.assertEqual(list(ticks), expected[1:])
+
+    def test_max_body_size(self):
+        bittrex = self.client(max_body_size=100)
+        with self.assertRaises(BittrexError):
+            bittrex.get_ticks(config.PAIR, 'oneMin')
+        with self.assertRaises(BittrexError):
+            list(bittrex.stream('market', 'GetTicks',
+                                {'marketName': config.PAIR,
+                                 'tickInterval': 'oneMin'}))
+
+    def test_stream_retries(self):
+        body = GzipHandler.body
+        attempts = []
+
+        class FlakyTransport(object):
+            def __call__(self, url, headers, timeout):
+                return Response(200, body)
+
+            def stream(self, url, headers, timeout):
+                attempts.append(url)
+                if len(attempts) == 1:
+                    raise ConnectionError('reset')
+                if len(attempts) == 2:
+                    return 503, iter(())
+                return 200, iter((body[:100], body[100:]))
+
+        bittrex = Bittrex(transport=FlakyTransport(), retries=2)
+        ticks = list(bittrex.stream('market', 'GetTicks',
+                                    {'marketName': config.PAIR,
+                                     'tickInterval': 'oneMin'}))
+        self.assertEqual(len(ticks), 60)
+        self.assertEqual(len(attempts), 3)
+
+    def test_stream_releases_connections(self):
+        from bittrex_v2.transport import RequestsTransport
+        responses = []
+
+        class FakeResponse(object):
+            headers = {}
+            raw = None
+
+            def __init__(self, status_code):
+                self.status_code = status_code
+                self.closed = False
+
+            def iter_content(self, chunk_size):
+                yield GzipHandler.body
+
+            def close(self):
+                self.closed = True
+
+        class FakeSession(object):
+            statuses = [503, 503, 200]
+
+            def get(self, url, **kwargs):
+                responses.append(FakeResponse(self.statuses.pop(0)))
+                return responses[-1]
+
+        transport = RequestsTransport(session=FakeSession())
+        bittrex = Bittrex(transport=transport, retries=1)
+        with self.assertRaises(BittrexError):
+            bittrex.stream('currencies', 'getcurrencies')
+        status, chunks = transport.stream('http://127.0.0.1/', {}, 5)
+        chunks.close()
+        self.assertEqual(len(responses), 3)
+        self.assertTrue(all(ret.closed for ret in responses))
+
+    def test_null_result(self):
+        body = b'{"success":true,"message":"","result":null}'
+        self.assertEqual(list(iter_result([body])), [])
+        bittrex = Bittrex('key', 'secret', transport=StubTransport(body))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'orders.csv')
+            self.assertEqual(export_history(bittrex, 'orders', path), 0)
+
+    def test_deadline_while_reading(self):
+        from bittrex_v2.transport import RequestsTransport
+        server = ThreadingHTTPServer(('127.0.0.1', 0), DripHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://127.0.0.1:%d/' % server.server_port
+        transport = RequestsTransport()
+        try:
+            self.assertEqual(transport(url, {}, 5).content, DripHandler.body)
+            # The whole body takes 0.75 sec, every read only 0.05
+            started = perf_counter()
+            with Deadline(0.2):
+                with self.assertRaises(DeadlineExceeded):
+                    transport(url, {}, 5)
+            with Deadline(0.2):
+                status, chunks = transport.stream(url, {}, 5)
+                with self.assertRaises(DeadlineExceeded):
+                    list(chunks)
+            self.assertLess(perf_counter() - started, 0.7)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_iter_result_chunks(self):
+        body = GzipHandler.body
+        chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+        self.assertEqual(list(iter_result(chunks)),
+                         json.loads(body)['result'])
+        with self.assertRaises(BittrexError):
+            list(iter_result([b'{"success":false,"message":"INVALID_MARKET",'
+                              b'"result":null}']))
+
 if __name__ == '__main__':
     unittest.main()
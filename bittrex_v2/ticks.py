@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Binary on-disk archive for GetTicks series.
+
+Every market and tick interval is stored in its own file
+(<root>/<market>/<interval>.ticks) made of a small header followed
+by fixed-width little-endian records:
+
+    T (int64, unix seconds)  O  H  L  C  V  BV  (float64)
+
+Files are opened through mmap, so columns are exposed as strided
+memoryviews over the mapped pages (no copies, no parsing) and time
+ranges are resolved with a binary search over the timestamp column.
+"""
+
+import os
+import struct
+from mmap import mmap, ACCESS_READ
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+from .bittrex import BittrexError
+
+
+MAGIC = b'BTRXTCK1'
+HEADER = struct.Struct('<8sQ')
+RECORD = struct.Struct('<q6d')
+FIELDS = ('T', 'O', 'H', 'L', 'C', 'V', 'BV')
+_WIDTH = len(FIELDS)
+
+
+def parse_tick_time(value):
+    """
+    Converts a GetTicks 'T' value (ex: '2017-10-01T00:05:00')
+    into unix seconds. Bittrex timestamps are UTC.
+
+    :param value: Tick timestamp
+    :type value: str, datetime, int or float
+
+    :rtype : int
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = value.rstrip('Z')
+        fmt = '%Y-%m-%dT%H:%M:%S.%f' if '.' in value else '%Y-%m-%dT%H:%M:%S'
+        value = datetime.strptime(value, fmt)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class TickSeries(object):
+    """
+    Read-only, memory-mapped view of one market/interval file.
+
+    Columns are returned as memoryviews sharing the mapped buffer:
+
+    >>> with archive.open('BTC-ETH', 'oneMin') as series:
+    ...     closes = series.column('C')
+    ...     window = series.between(start, end)
+
+    :param path: Path to a .ticks file
+    :type path: str
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            self._file.close()
+            raise BittrexError("Invalid tick file: %s" % path)
+        self._map = mmap(self._file.fileno(), 0, access=ACCESS_READ)
+        magic, record_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            self.close()
+            raise BittrexError("Invalid tick file: %s" % path)
+        self._count = (size - HEADER.size) // RECORD.size
+        body = memoryview(self._map)[HEADER.size:
+                                     HEADER.size + self._count * RECORD.size]
+        self._body = body
+        self._ints = body.cast('q')
+        self._floats = body.cast('d')
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Releases the views and the underlying mapping."""
+        for name in ('_ints', '_floats', '_body'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        if getattr(self, '_map', None) is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Columns still referenced by the caller keep the
+                # mapping alive, it is unmapped once they are released.
+                pass
+            self._map = None
+        self._file.close()
+
+    @property
+    def timestamps(self):
+        """Timestamp column (unix seconds) as a memoryview of int64."""
+        return self._ints[0::_WIDTH]
+
+    def column(self, field):
+        """
+        Returns a zero-copy strided view of a single column.
+
+        :param field: One of 'T', 'O', 'H', 'L', 'C', 'V', 'BV'
+        :type field: str
+
+        :rtype : memoryview
+        """
+        if field == 'T':
+            return self.timestamps
+        try:
+            index = FIELDS.index(field)
+        except ValueError:
+            raise BittrexError("Invalid tick field: %s" % field)
+        return self._floats[index::_WIDTH]
+
+    def record(self, index):
+        """Returns a single tick as a tuple (T, O, H, L, C, V, BV)."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return RECORD.unpack_from(self._body, index * RECORD.size)
+
+    def __getitem__(self, index):
+        return self.record(index)
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield RECORD.unpack_from(self._body, index * RECORD.size)
+
+    def bounds(self, start=None, end=None):
+        """
+        Binary searches the timestamp column and returns the
+        [first, last) record indexes with start <= T <= end.
+
+        :param start: Range start (unix seconds, datetime or tick str)
+        :param end: Range end (inclusive)
+
+        :rtype : tuple
+        """
+        stamps = self.timestamps
+        lo = 0 if start is None else bisect_left(stamps,
+                                                 parse_tick_time(start))
+        hi = self._count if end is None else bisect_right(stamps,
+                                                          parse_tick_time(end))
+        return lo, max(lo, hi)
+
+    def between(self, start=None, end=None):
+        """
+        Returns a new TickWindow over the records inside a time range.
+        Columns of the window are still views over the mapped file.
+        """
+        lo, hi = self.bounds(start, end)
+        return TickWindow(self, lo, hi)
+
+
+class TickWindow(object):
+    """Contiguous slice of a TickSeries returned by between()."""
+    def __init__(self, series, lo, hi):
+        self.series = series
+        self.lo = lo
+        self.hi = hi
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def __iter__(self):
+        for index in range(self.lo, self.hi):
+            yield self.series.record(index)
+
+    def column(self, field):
+        return self.series.column(field)[self.lo:self.hi]
+
+
+class TickArchive(object):
+    """
+    Directory of binary tick files, one per market and interval.
+
+    :param root: Directory where tick files are stored
+    :type root: str
+    """
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, market, interval):
+        """Returns the file path for a market and tick interval."""
+        return os.path.join(self.root, market, '%s.ticks' % interval)
+
+    def last_timestamp(self, market, interval):
+        """
+        Returns the timestamp of the newest stored tick
+        or None if nothing has been archived yet.
+        """
+        path = self.path(market, interval)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        if size < HEADER.size + RECORD.size:
+            return None
+        with open(path, 'rb') as f:
+            f.seek(HEADER.size + ((size - HEADER.size) // RECORD.size - 1)
+                   * RECORD.size)
+            return RECORD.unpack(f.read(RECORD.size))[0]
+
+    def append(self, market, interval, ticks):
+        """
+        Appends ticks to the archive. Accepts a get_ticks() response
+        or its 'result' list. Ticks older than or equal to the newest
+        stored one are skipped, so overlapping downloads can be
+        appended safely.
+
+        :param market: String literal for the market (ex: BTC-LTC)
+        :type market: str
+
+        :param interval: Tick interval (ex: oneMin)
+        :type interval: str
+
+        :param ticks: get_ticks() response or list of ticks
+        :type ticks: dict or list
+
+        :return: Number of records written
+        :rtype : int
+        """
+        if isinstance(ticks, dict):
+            if not ticks.get('success', True):
+                raise BittrexError(ticks.get('message'))
+            ticks = ticks.get('result') or []
+
+        last = self.last_timestamp(market, interval)
+        path = self.path(market, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        buf = bytearray()
+        for tick in sorted(ticks, key=lambda t: parse_tick_time(t['T'])):
+            stamp = parse_tick_time(tick['T'])
+            if last is not None and stamp <= last:
+                continue
+            buf += RECORD.pack(stamp, float(tick['O']), float(tick['H']),
+                               float(tick['L']), float(tick['C']),
+                               float(tick['V']), float(tick.get('BV', 0)))
+            last = stamp
+
+        with open(path, 'ab') as f:
+            size = f.tell()
+            if size < HEADER.size:
+                f.truncate(0)
+                f.write(HEADER.pack(MAGIC, RECORD.size))
+            elif (size - HEADER.size) % RECORD.size:
+                # Drop a partial record left by an interrupted append,
+                # later records would be misaligned otherwise
+                f.truncate(size - (size - HEADER.size) % RECORD.size)
+            f.write(buf)
+        return len(buf) // RECORD.size
+
+    def open(self, market, interval):
+        """Opens a market/interval file as a memory-mapped TickSeries."""
+        return TickSeries(self.path(market, interval))
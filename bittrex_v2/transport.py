@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pluggable HTTP transports used by Bittrex.__call__.
+
+A transport is any callable with the signature
+
+    transport(url, headers, timeout) -> Response
+
+so requests can be sent through 'requests', recorded to a log
+or served back from a previous recording without network access.
+"""
+
+import json
+from collections import namedtuple, defaultdict, deque
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from time import time, sleep, perf_counter
+
+from .bittrex import BittrexError
+from .deadline import current
+
+
+Response = namedtuple('Response', ['status_code', 'content'])
+
+REDACTED = 'REDACTED'
+_SECRET_PARAMS = ('apikey',)
+_VOLATILE_PARAMS = ('nonce',)
+
+
+def redact_url(url, drop=()):
+    """
+    Returns url with credentials replaced by 'REDACTED'.
+
+    :param url: Url to redact
+    :type url: str
+
+    :param drop: Query params removed from the url (ex: ('nonce',))
+    :type drop: tuple
+    """
+    parts = urlsplit(url)
+    query = [(k, REDACTED if k in _SECRET_PARAMS else v)
+             for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k not in drop]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class RequestsTransport(object):
+    """
+    Default transport, sends GET requests through 'requests'.
+
+    Compressed encodings supported by urllib3 are negotiated and
+    bodies are read and decompressed in chunks, never holding more
+    than the decoded body in memory. A 'stream' method returns the
+    decoded chunks without joining them. Reading stops with
+    'DeadlineExceeded' once the active deadline is over.
+
+    :param session: Optional requests.Session used to reuse
+        connections between calls (default == None)
+    :type session: requests.Session
+
+    :param max_body_size: Maximum decoded body size in bytes,
+        larger responses raise 'BittrexError' (default == None)
+    :type max_body_size: int
+
+    :param chunk_size: Bytes read at once (default == 65536)
+    :type chunk_size: int
+    """
+    def __init__(self, session=None, max_body_size=None, chunk_size=65536):
+        self.session = session
+        self.max_body_size = max_body_size
+        self.chunk_size = chunk_size
+
+    def _get(self, url, headers, timeout):
+        from requests import get as _get
+        from urllib3.util.request import ACCEPT_ENCODING
+        get = self.session.get if self.session is not None else _get
+        headers = dict(headers, **{'Accept-Encoding': ACCEPT_ENCODING})
+        return get(url, headers=headers, timeout=timeout, stream=True)
+
+    def _read(self, ret):
+        read1 = getattr(ret.raw, 'read1', None)
+        if read1 is None:
+            # urllib3 < 2 only reads whole chunks
+            return ret.iter_content(self.chunk_size)
+        # Returns what is available, so slow bodies are seen arriving
+        return iter(lambda: read1(self.chunk_size, decode_content=True), b'')
+
+    def _chunks(self, ret):
+        # Read timeouts apply to every socket read, the active
+        # deadline bounds the whole body
+        deadline = current()
+        size = 0
+        try:
+            for chunk in self._read(ret):
+                if deadline is not None:
+                    deadline.check()
+                size += len(chunk)
+                if self.max_body_size and size > self.max_body_size:
+                    raise BittrexError("Response body exceeds %s bytes"
+                                       % self.max_body_size)
+                yield chunk
+        finally:
+            ret.close()
+
+    def __call__(self, url, headers, timeout):
+        ret = self._get(url, headers, timeout)
+        length = ret.headers.get('Content-Length')
+        if self.max_body_size and length and \
+                'Content-Encoding' not in ret.headers and \
+                int(length) > self.max_body_size:
+            ret.close()
+            raise BittrexError("Response body exceeds %s bytes"
+                               % self.max_body_size)
+        body = bytearray()
+        for chunk in self._chunks(ret):
+            body += chunk
+        return Response(ret.status_code, body)
+
+    def stream(self, url, headers, timeout):
+        """
+        Sends a request and returns (status_code, chunks), where
+        chunks is an iterator of decoded body bytes. Bodies of
+        other statuses than 200 are not read and the connection is
+        released at once.
+        """
+        ret = self._get(url, headers, timeout)
+        if ret.status_code != 200:
+            ret.close()
+            return ret.status_code, iter(())
+        return ret.status_code, _Body(ret, self._chunks(ret))
+
+
+class _Body(object):
+    """
+    Chunks of a streamed response. close() releases the connection
+    even if iteration never started, which closing the generator
+    alone doesn't do.
+    """
+    def __init__(self, ret, chunks):
+        self._ret = ret
+        self._chunks = chunks
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def close(self):
+        self._chunks.close()
+        self._ret.close()
+
+
+class RecordingTransport(object):
+    """
+    Wraps another transport and appends every exchange to a
+    JSON lines log: redacted url, offset from the first request,
+    elapsed time, status code and raw body. The 'apisign' header
+    is never written.
+
+    :param path: Log file path
+    :type path: str
+
+    :param transport: Transport actually sending requests
+        (default == RequestsTransport())
+    :type transport: callable
+    """
+    def __init__(self, path, transport=None):
+        self.path = path
+        self.transport = transport or RequestsTransport()
+        self._start = None
+        self._log = open(path, 'a', encoding='utf-8')
+
+    def __call__(self, url, headers, timeout):
+        if self._start is None:
+            self._start = time()
+        started = time()
+        t0 = perf_counter()
+        ret = self.transport(url, headers, timeout)
+        elapsed = perf_counter() - t0
+        self._log.write(json.dumps({
+            'url': redact_url(url),
+            'offset': round(started - self._start, 6),
+            'elapsed': round(elapsed, 6),
+            'status': ret.status_code,
+            'body': ret.content.decode('utf-8'),
+            }, separators=(',', ':')) + '\n')
+        self._log.flush()
+        return ret
+
+    def close(self):
+        self._log.close()
+
+
+class ReplayTransport(object):
+    """
+    Serves responses from a log written by RecordingTransport.
+
+    Requests are matched by url (credentials and nonce ignored) and
+    served in recorded order. With speed, calls are delayed to follow
+    the original timing accelerated by that factor (ex: speed=10 runs
+    the session 10 times faster than real time); with speed=None
+    responses are served immediately.
+
+    :param path: Log file path
+    :type path: str
+
+    :param speed: Replay speed factor (default == None)
+    :type speed: float
+    """
+    def __init__(self, path, speed=None):
+        self.path = path
+        self.speed = speed
+        self._entries = defaultdict(deque)
+        with open(path, encoding='utf-8') as log:
+            for line in log:
+                if line.strip():
+                    entry = json.loads(line)
+                    key = redact_url(entry['url'], drop=_VOLATILE_PARAMS)
+                    self._entries[key].append(entry)
+        self._start = None
+
+    def __call__(self, url, headers, timeout):
+        key = redact_url(url, drop=_VOLATILE_PARAMS)
+        try:
+            entry = self._entries[key].popleft()
+        except IndexError:
+            raise BittrexError("No recorded response for: %s" % key)
+
+        if self.speed:
+            if self._start is None:
+                self._start = perf_counter() - entry['offset'] / self.speed
+            due = (self._start + (entry['offset'] + entry['elapsed'])
+                   / self.speed)
+            wait = due - perf_counter()
+            if wait > 0:
+                sleep(wait)
+        return Response(entry['status'], entry['body'].encode('utf-8'))
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from distutils.core import setup
+from setuptools import setup
 
 setup(
     name = 'bittrex_v2',
@@ -15,5 +15,8 @@ setup(
     description = 'Python wrapper for Bittrex API V2, currently in beta.',
     long_description = open('README.md','r').read(),
     keywords = ['python', 'bittrex', 'exchange', 'cryptocurrency', 'API', 'wrapper', 'v2'],
-    install_requires = ['requests']
+    python_requires = '>=3.8',
+    install_requires = ['requests'],
+    extras_require = {'parquet': ['pyarrow']},
+    entry_points = {'console_scripts': ['bittrex_v2 = bittrex_v2.cli:main']}
 )